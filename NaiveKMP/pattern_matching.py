@@ -140,10 +140,18 @@ pattern_data
 #                 break
 #     return match
 
-def StreamingMatcher(text, delay=0.05):
-    for char in text:
+def StreamingMatcher(text, delay=0.05, arrivals=None, clock=None):
+    # arrivals: optional list collecting (end_offset, time) per character,
+    # used to compute detection latency of matches
+    # clock: optional virtual clock (e.g. replay_source.VirtualClock) whose
+    # sleep() advances simulated time instead of blocking
+    sleep = clock.sleep if clock is not None else time.sleep
+    now = clock.time if clock is not None else time.perf_counter
+    for index, char in enumerate(text):
+        if arrivals is not None:
+            arrivals.append((index + 1, now()))
         yield char
-        time.sleep(delay)
+        sleep(delay)
 
 def str_match(str1, str2):
     if len(str1) != len(str2):
@@ -153,7 +161,7 @@ def str_match(str1, str2):
             return False
     return True
 # Naive pattern matching
-def naive_stream_matching(text, pattern, delay=0.05):
+def naive_stream_matching(text, pattern, delay=0.05, clock=None):
     """
     Simulate pattern matching using naive for stream data
     """
@@ -163,7 +171,7 @@ def naive_stream_matching(text, pattern, delay=0.05):
     matches = []
     index = -1
 
-    for char in StreamingMatcher(text, delay):
+    for char in StreamingMatcher(text, delay, clock=clock):
         index = index + 1
         window.append(char)
         if len(window) == m:
@@ -208,7 +216,7 @@ def compute_lps(pattern):
     return lps
 
 # KMP pattern matching
-def kmp_stream_matching(text, pattern, delay=0.05):
+def kmp_stream_matching(text, pattern, delay=0.05, clock=None):
     # n = len(text)
     m = len(pattern)
     lps = compute_lps(pattern)
@@ -217,7 +225,7 @@ def kmp_stream_matching(text, pattern, delay=0.05):
     j = 0  # index for pattern
     index = -1
 
-    for char in StreamingMatcher(text, delay):
+    for char in StreamingMatcher(text, delay, clock=clock):
         index = index + 1
         while j > 0 and pattern[j] != char:
             j = lps[j-1]
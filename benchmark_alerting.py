@@ -0,0 +1,128 @@
+import csv
+import os
+import time
+
+from functions import (
+    stream_chunks,
+    naive_chunk_stream_matching,
+    kmp_chunk_stream_matching,
+    first_match,
+    match_exists
+)
+from generate_augmented_flows import augment_sequence
+from main2 import predefined_patterns, generated_file_prefix, target_sizes_mb
+
+ALERT_ENGINES = {
+    "Naive Stream": naive_chunk_stream_matching,
+    "KMP Stream": kmp_chunk_stream_matching
+}
+
+ALERT_MAX_MATCHES = 10
+ALERT_CHUNK_SIZE = 4096
+
+ALERT_HEADER = [
+    "engine", "target_ip", "pattern", "text_length", "mode",
+    "match_count", "answer", "time_sec", "speedup_vs_full_scan"
+]
+
+def high_match_rate_ips(results_csv="main2_custom_pattern_results.csv", top=3):
+    """
+    Return the IPs with the highest KMP matches per character in main2's results.
+    """
+    rates = {}
+    with open(results_csv, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            rate = int(row["kmp_match_count"]) / max(1, int(row["text_length_chars"]))
+            rates.setdefault(row["target_ip"], []).append(rate)
+    ranked = sorted(rates, key=lambda ip: sum(rates[ip]) / len(rates[ip]), reverse=True)
+    return ranked[:top]
+
+def load_alert_texts(ips, text_length, original_file="flow_sequences.txt"):
+    """
+    Load each IP's sequence from the smallest augmented file, or augment the
+    original sequence to text_length when the augmented files are not present.
+    """
+    texts = {}
+    augmented_path = f"{generated_file_prefix}{target_sizes_mb[0]}mb.txt"
+    source_path = augmented_path if os.path.exists(augmented_path) else original_file
+    with open(source_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if ':' not in line:
+                continue
+            ip_str, seq_str = line.split(':', 1)
+            if ip_str.strip() in ips:
+                texts[ip_str.strip()] = seq_str.strip()
+    if source_path == original_file:
+        texts = {ip: augment_sequence(seq, text_length) for ip, seq in texts.items()}
+    return texts
+
+def time_alert_modes(engine, text, pattern):
+    """
+    Time a full scan against the early-exit modes for one engine and text.
+
+    Returns:
+        list: (mode, match_count, answer, time_sec) per mode.
+    """
+    def scan(max_matches=None):
+        matches = engine(stream_chunks(text, ALERT_CHUNK_SIZE), pattern, max_matches=max_matches)
+        return len(matches), matches[0] if matches else None
+
+    def first():
+        position = first_match(stream_chunks(text, ALERT_CHUNK_SIZE), pattern, engine)
+        return int(position is not None), position
+
+    def exists():
+        found = match_exists(stream_chunks(text, ALERT_CHUNK_SIZE), pattern, engine)
+        return int(found), found
+
+    modes = [
+        ("full_scan", scan),
+        (f"max_matches={ALERT_MAX_MATCHES}", lambda: scan(ALERT_MAX_MATCHES)),
+        ("first_match", first),
+        ("exists", exists)
+    ]
+    timings = []
+    for mode, run in modes:
+        start = time.perf_counter()
+        match_count, answer = run()
+        elapsed = time.perf_counter() - start
+        timings.append((mode, match_count, answer, elapsed))
+    return timings
+
+def main():
+    results_csv = "main2_custom_pattern_results.csv"
+    if not os.path.exists(results_csv):
+        print(f"Error: {results_csv} not found. Run main2.py first.")
+        return
+
+    ips = high_match_rate_ips(results_csv)
+    print(f"High match-rate IPs from {results_csv}: {', '.join(ips)}")
+    text_length = 1048572  # text_length_chars of the 10MB augmented file
+    texts = load_alert_texts(ips, text_length)
+
+    rows = []
+    for ip in ips:
+        if ip not in texts or ip not in predefined_patterns:
+            print(f"  IP {ip} has no text or predefined pattern. Skipping.")
+            continue
+        pattern = predefined_patterns[ip]
+        text = texts[ip]
+        for engine_name, engine in ALERT_ENGINES.items():
+            timings = time_alert_modes(engine, text, pattern)
+            full_time = timings[0][3]
+            for mode, match_count, answer, elapsed in timings:
+                speedup = full_time / elapsed if elapsed > 0 else float('inf')
+                rows.append([engine_name, ip, pattern, len(text), mode,
+                             match_count, answer, elapsed, speedup])
+                print(f"  IP {ip} {engine_name:12s} {mode:15s}: {elapsed:10.6f}s "
+                      f"({speedup:10.1f}x vs full scan)")
+
+    output_csv_filename = "alerting_early_exit_results.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ALERT_HEADER)
+        writer.writerows(rows)
+    print(f"\n✅ Early-exit benchmark complete. Results saved to {output_csv_filename}")
+
+if __name__ == "__main__":
+    main()
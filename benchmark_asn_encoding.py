@@ -0,0 +1,87 @@
+import csv
+import time
+from itertools import accumulate
+
+from functions import (
+    stream_chunks,
+    naive_chunk_stream_matching,
+    kmp_chunk_stream_matching
+)
+from main import build_encoded_sequences, build_asn_token_sequences
+
+ENCODING_ENGINES = {
+    "Naive Stream": naive_chunk_stream_matching,
+    "KMP Stream": kmp_chunk_stream_matching
+}
+
+ENCODING_CHUNK_SIZE = 4096
+
+ENCODING_HEADER = [
+    "pattern_ip", "target_ip", "engine",
+    "string_text_length", "token_text_length",
+    "string_pattern_length", "token_pattern_length",
+    "string_match_count", "string_misaligned_matches", "token_match_count",
+    "string_time_sec", "token_time_sec", "token_speedup_ratio_time"
+]
+
+def timed_scan(engine, text, pattern):
+    start = time.perf_counter()
+    matches = engine(stream_chunks(text, ENCODING_CHUNK_SIZE), pattern)
+    return matches, time.perf_counter() - start
+
+def token_boundaries(sequence):
+    """
+    Offsets in the string encoding at which an ASN code starts or ends.
+    """
+    return set(accumulate((len(code) for code in sequence), initial=0))
+
+def main():
+    file_path = "cs448b_ipasn.csv"
+    print("Building string and integer-token ASN encodings...")
+    encoded = build_encoded_sequences(file_path)
+    tokens = build_asn_token_sequences(file_path)
+    asn_to_char = encoded["asn_to_char"]
+    token_to_code = {token: asn_to_char[asn] for asn, token in tokens["asn_to_token"].items()}
+
+    rows = []
+    for pattern_ip, token_pattern in tokens["asn_token_patterns"].items():
+        string_pattern = encoded["asn_patterns_data"][pattern_ip]
+        for target_ip, token_text in tokens["ip_asn_tokens"].items():
+            string_text = encoded["ip_asn_sequences_str"][target_ip]
+            boundaries = token_boundaries(token_to_code[token] for token in token_text)
+            for engine_name, engine in ENCODING_ENGINES.items():
+                string_matches, string_time = timed_scan(engine, string_text, string_pattern)
+                token_matches, token_time = timed_scan(engine, token_text, token_pattern)
+                # A string match is spurious if it starts or ends inside an ASN code
+                misaligned = sum(1 for m in string_matches
+                                 if m not in boundaries or m + len(string_pattern) not in boundaries)
+                speedup = string_time / token_time if token_time > 0 else float('inf')
+                rows.append([
+                    pattern_ip, target_ip, engine_name,
+                    len(string_text), len(token_text),
+                    len(string_pattern), len(token_pattern),
+                    len(string_matches), misaligned, len(token_matches),
+                    string_time, token_time, speedup
+                ])
+
+    for engine_name in ENCODING_ENGINES:
+        engine_rows = [row for row in rows if row[2] == engine_name]
+        string_total = sum(row[10] for row in engine_rows)
+        token_total = sum(row[11] for row in engine_rows)
+        print(f"  {engine_name:12s}: string {string_total:.4f}s, tokens {token_total:.4f}s "
+              f"({string_total / token_total:.2f}x), "
+              f"{sum(row[8] for row in engine_rows)} misaligned string matches")
+    string_chars = sum(len(seq) for seq in encoded["ip_asn_sequences_str"].values())
+    token_count = sum(len(seq) for seq in tokens["ip_asn_tokens"].values())
+    print(f"  Text size: {string_chars} string symbols vs {token_count} tokens "
+          f"({string_chars / token_count:.2f}x shorter)")
+
+    output_csv_filename = "asn_encoding_comparison_results.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ENCODING_HEADER)
+        writer.writerows(rows)
+    print(f"\n✅ ASN encoding comparison complete. Results saved to {output_csv_filename}")
+
+if __name__ == "__main__":
+    main()
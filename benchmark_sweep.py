@@ -0,0 +1,132 @@
+import csv
+import os
+import time
+
+from functions import (
+    stream_chunks,
+    naive_chunk_stream_matching,
+    kmp_chunk_stream_matching
+)
+from detection_latency import detection_latencies, latency_percentiles
+from generate_augmented_flows import augment_sequence
+
+# Streaming engines covered by the sweep, keyed by the label used in the results
+STREAMING_ENGINES = {
+    "Naive Stream": naive_chunk_stream_matching,
+    "KMP Stream": kmp_chunk_stream_matching
+}
+
+DEFAULT_CHUNK_SIZES = [1, 64, 4 * 1024, 64 * 1024, 1024 * 1024]
+DEFAULT_TEXT_LENGTHS = [10000, 100000, 1000000]
+
+SWEEP_HEADER = [
+    "engine", "text_length", "chunk_size", "pattern", "pattern_length",
+    "match_count", "time_sec", "chars_per_sec", "mb_per_sec",
+    "latency_p50_sec", "latency_p95_sec", "latency_p99_sec", "latency_max_sec"
+]
+
+def measure_throughput(engine, text, pattern, chunk_size, repeats=3):
+    """
+    Time one streaming engine over text fed in chunk_size pieces.
+
+    The best of `repeats` runs is kept, which filters out scheduler noise
+    without hiding per-call overhead (that is the same in every run).
+
+    Returns:
+        tuple: (match_count, time_sec, chars_per_sec, mb_per_sec)
+    """
+    best_time = float('inf')
+    match_count = 0
+    for _ in range(repeats):
+        chunks = stream_chunks(text, chunk_size)
+        start = time.perf_counter()
+        matches = engine(chunks, pattern)
+        elapsed = time.perf_counter() - start
+        match_count = len(matches)
+        best_time = min(best_time, elapsed)
+
+    text_bytes = len(text.encode('utf-8'))
+    chars_per_sec = len(text) / best_time if best_time > 0 else float('inf')
+    mb_per_sec = text_bytes / (1024 * 1024) / best_time if best_time > 0 else float('inf')
+    return match_count, best_time, chars_per_sec, mb_per_sec
+
+def measure_detection_latency(engine, text, pattern, chunk_size):
+    """
+    Run one instrumented pass and summarize per-match detection latency.
+
+    Kept separate from measure_throughput so the timestamping does not
+    inflate the throughput numbers.
+    """
+    arrivals = []
+    match_times = []
+    matches = engine(stream_chunks(text, chunk_size, arrivals), pattern, match_times)
+    return latency_percentiles(detection_latencies(matches, len(pattern), arrivals, match_times))
+
+def run_chunk_size_sweep(texts, pattern, chunk_sizes=None, engines=None, repeats=3):
+    """
+    Run every streaming engine over every text at every chunk size.
+
+    Args:
+        texts (dict): Text length label -> text to scan.
+        pattern (str): Pattern to search for.
+        chunk_sizes (list): Ingest chunk sizes to try.
+        engines (dict): Engine label -> chunk-consuming matcher.
+        repeats (int): Runs per configuration; the fastest is reported.
+
+    Returns:
+        list: Result rows in SWEEP_HEADER order.
+    """
+    chunk_sizes = chunk_sizes or DEFAULT_CHUNK_SIZES
+    engines = engines or STREAMING_ENGINES
+    rows = []
+    for text_length, text in texts.items():
+        for chunk_size in chunk_sizes:
+            for engine_name, engine in engines.items():
+                match_count, elapsed, cps, mbps = measure_throughput(
+                    engine, text, pattern, chunk_size, repeats)
+                latency = measure_detection_latency(engine, text, pattern, chunk_size)
+                rows.append([
+                    engine_name, text_length, chunk_size, pattern, len(pattern),
+                    match_count, elapsed, cps, mbps,
+                    latency["p50"], latency["p95"], latency["p99"], latency["max"]
+                ])
+                print(f"  {engine_name:12s} n={text_length:>8d} chunk={chunk_size:>8d}: "
+                      f"{elapsed:8.4f}s {mbps:8.2f} MB/s {match_count:7d} matches, "
+                      f"p99 latency {latency['p99'] * 1e6:10.1f}us")
+    return rows
+
+def build_sweep_texts(original_file, text_lengths, ip="1"):
+    """
+    Build texts of the requested lengths by augmenting one IP's flow sequence.
+    """
+    with open(original_file, 'r', encoding='utf-8') as f:
+        sequences = {}
+        for line in f:
+            line = line.strip()
+            if not line or ':' not in line:
+                continue
+            ip_str, seq_str = line.split(':', 1)
+            sequences[ip_str.strip()] = seq_str.strip()
+    base = sequences.get(ip) or next(iter(sequences.values()))
+    return {length: augment_sequence(base, length) for length in text_lengths}
+
+def main():
+    original_file = "flow_sequences.txt"
+    pattern = "xxxxxxx"  # predefined pattern for IP 1 in main2.py
+    if not os.path.exists(original_file):
+        print(f"Error: The input file '{original_file}' does not exist.")
+        return
+
+    print("Starting chunk-size sweep for streaming engines...")
+    texts = build_sweep_texts(original_file, DEFAULT_TEXT_LENGTHS)
+    rows = run_chunk_size_sweep(texts, pattern)
+
+    output_csv_filename = "chunk_size_sweep_results.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SWEEP_HEADER)
+        writer.writerows(rows)
+    print(f"\n✅ Chunk-size sweep complete. Results saved to {output_csv_filename}")
+
+if __name__ == "__main__":
+    main()
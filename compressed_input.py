@@ -0,0 +1,171 @@
+## Transparent gzip/bz2/xz input
+# Archived sequence and flow log files are often stored compressed. The format
+# is detected from the file's magic bytes (not its extension) and the file is
+# decompressed incrementally, so a reader only ever holds one chunk of
+# decompressed text.
+
+import bz2
+import gzip
+import lzma
+
+from functions import compute_lps, kmp_feed
+
+# Names match pandas.read_csv's compression argument
+COMPRESSION_MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00"
+}
+COMPRESSION_OPENERS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open
+}
+# Usual extensions, only for finding archived copies of a file; the format
+# itself is always detected from the magic bytes
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz")
+DEFAULT_CHUNK_CHARS = 1 << 16
+
+def detect_compression(path):
+    """
+    Return "gzip", "bz2" or "xz" from the file's magic bytes, or None for plain files.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(max(len(magic) for magic in COMPRESSION_MAGIC.values()))
+    for name, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+def open_input(path, mode='rt', encoding='utf-8', newline=None):
+    """
+    Open a plain or compressed file for streaming reads.
+    """
+    opener = COMPRESSION_OPENERS.get(detect_compression(path), open)
+    if 'b' in mode:
+        return opener(path, mode)
+    return opener(path, mode, encoding=encoding, newline=newline)
+
+def iter_sequence_chunks(path, chunk_size=DEFAULT_CHUNK_CHARS):
+    """
+    Stream an 'ip: sequence' file as (ip, piece) pairs without reading whole lines.
+
+    Concatenating the pieces for an IP gives the sequence load_sequence_file()
+    would return for it. IPs with an empty sequence yield nothing.
+    """
+    ip = None
+    header = []  # Pieces of an 'ip:' prefix split across chunks
+    with open_input(path) as f:
+        for block in iter(lambda: f.read(chunk_size), ''):
+            pos = 0
+            while pos < len(block):
+                newline = block.find('\n', pos)
+                line_end = len(block) if newline == -1 else newline
+                if ip is None:
+                    colon = block.find(':', pos, line_end)
+                    if colon == -1:
+                        header.append(block[pos:line_end])
+                        if newline != -1:
+                            line = ''.join(header).strip()
+                            if line:
+                                print(f"    Warning: Skipping malformed line in '{path}': {line[:80]}")
+                            header = []
+                        pos = line_end + 1
+                        continue
+                    header.append(block[pos:colon])
+                    ip = ''.join(header).strip()
+                    header = []
+                    pos = colon + 1
+                    continue
+                # Symbols are never whitespace, so stripping each piece is the
+                # same as stripping the whole line
+                piece = block[pos:line_end].strip()
+                if piece:
+                    yield ip, piece
+                if newline != -1:
+                    ip = None
+                pos = line_end + 1
+    line = ''.join(header).strip()
+    if line:
+        print(f"    Warning: Skipping malformed line in '{path}': {line[:80]}")
+
+def match_sequence_file(path, patterns, chunk_size=DEFAULT_CHUNK_CHARS):
+    """
+    KMP-match each IP's pattern against its sequence while streaming the file.
+
+    Args:
+        path (str): Plain or compressed 'ip: sequence' file.
+        patterns (dict): ip -> pattern. Other IPs are skipped.
+        chunk_size (int): Decompressed characters read at a time.
+
+    Returns:
+        tuple: ({ip: match positions}, symbols scanned)
+    """
+    lps = {ip: compute_lps(pattern) for ip, pattern in patterns.items() if pattern}
+    states = {}  # ip -> (j, position)
+    matches = {ip: [] for ip in lps}
+    scanned = 0
+    for ip, piece in iter_sequence_chunks(path, chunk_size):
+        if ip not in lps:
+            continue
+        j, position = states.get(ip, (0, 0))
+        states[ip] = kmp_feed(piece, patterns[ip], lps[ip], j, position, matches[ip])
+        scanned += len(piece)
+    return matches, scanned
+
+if __name__ == "__main__":
+    import csv
+    import os
+    import random
+    import shutil
+    import tempfile
+    import time
+
+    from main2 import predefined_patterns
+    from generate_augmented_flows import generate_large_flow_file
+
+    source_path = "flow_sequences_10mb.txt"
+    temp_dir = tempfile.mkdtemp()
+    try:
+        if not os.path.exists(source_path):
+            print(f"'{source_path}' not found; generating a 10MB file in {temp_dir}.")
+            random.seed(0)
+            generated_path = os.path.join(temp_dir, os.path.basename(source_path))
+            generate_large_flow_file("flow_sequences.txt", 10, generated_path)
+            source_path = generated_path
+
+        inputs = {"none": source_path}
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        for name, opener in COMPRESSION_OPENERS.items():
+            compressed_path = os.path.join(temp_dir, f"sequences.{name}")
+            with opener(compressed_path, 'wb') as f:
+                f.write(data)
+            inputs[name] = compressed_path
+
+        header = ["compression", "file_size_bytes", "symbols_scanned", "match_count",
+                  "time_sec", "symbols_per_sec", "slowdown_vs_uncompressed"]
+        rows = []
+        baseline_time = baseline_matches = None
+        for name, path in inputs.items():
+            start = time.perf_counter()
+            matches, scanned = match_sequence_file(path, predefined_patterns)
+            elapsed = time.perf_counter() - start
+            if baseline_time is None:
+                baseline_time, baseline_matches = elapsed, matches
+            elif matches != baseline_matches:
+                print(f"  Warning: {name} input produced different matches")
+            match_count = sum(len(positions) for positions in matches.values())
+            rows.append([name, os.path.getsize(path), scanned, match_count,
+                         elapsed, scanned / elapsed, elapsed / baseline_time])
+            print(f"  {name:5s}: {os.path.getsize(path) / (1024 * 1024):6.2f}MB on disk, "
+                  f"{match_count} matches, {elapsed:.3f}s ({scanned / elapsed / 1e6:.2f}M symbols/s)")
+    finally:
+        shutil.rmtree(temp_dir)
+
+    output_csv_filename = "compressed_input_results.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    print(f"\n✅ Compressed input benchmark complete. Results saved to {output_csv_filename}")
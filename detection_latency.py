@@ -0,0 +1,54 @@
+## Detection latency helpers
+# Turns the arrival timestamps recorded by a stream source and the emission
+# timestamps recorded by a matcher into per-match detection latencies.
+
+from bisect import bisect_left
+
+def detection_latencies(matches, pattern_length, arrivals, match_times):
+    """
+    Compute how long after its last symbol arrived each match was reported.
+
+    Args:
+        matches (list): Match start positions, in emission order.
+        pattern_length (int): Length of the matched pattern.
+        arrivals (list): (end_offset, time) pairs recorded by the source, one
+            per chunk, in stream order.
+        match_times (list): Emission time of each match, same order as matches.
+
+    Returns:
+        list: Latency in seconds for each match.
+    """
+    if len(matches) != len(match_times):
+        raise ValueError("matches and match_times must have the same length")
+    end_offsets = [end for end, _ in arrivals]
+    latencies = []
+    for start, emitted_at in zip(matches, match_times):
+        # The chunk holding the match's last symbol is the first one whose end
+        # offset is past that symbol.
+        k = bisect_left(end_offsets, start + pattern_length)
+        latencies.append(emitted_at - arrivals[k][1])
+    return latencies
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted list (q in [0, 100]).
+    """
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+def latency_percentiles(latencies):
+    """
+    Summarize detection latencies.
+
+    Returns:
+        dict: p50, p95, p99 and max latency in seconds (NaN when no matches).
+    """
+    ordered = sorted(latencies)
+    return {
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else float('nan')
+    }
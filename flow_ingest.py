@@ -0,0 +1,140 @@
+## Chunked ingestion for flow logs larger than RAM
+# Reads the flow log with read_csv(chunksize=...) and explicit compact dtypes,
+# aggregates daily flows and appends encoded symbols per IP as each chunk is
+# processed. Only the current chunk and one open day per IP are held at once.
+
+import numpy as np
+import pandas as pd
+
+from main import flow_bucket, asn_code
+from compressed_input import detect_compression
+
+# Compact dtypes: r_asn repeats heavily, so a categorical stores each chunk's
+# ASNs as small integer codes plus one copy of every distinct value
+FLOW_LOG_DTYPES = {
+    'l_ipn': 'uint32',
+    'r_asn': 'category',
+    'f': 'uint32'
+}
+
+DEFAULT_CHUNKSIZE = 100000
+
+def iter_flow_log_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield DataFrame chunks of at most chunksize rows with compact dtypes.
+    """
+    return pd.read_csv(file_path, chunksize=chunksize, dtype=FLOW_LOG_DTYPES, parse_dates=['date'],
+                       compression=detect_compression(file_path))
+
+def iter_encoded_segments(file_path, chunksize=DEFAULT_CHUNKSIZE, asn_to_char=None):
+    """
+    Stream (encoding, ip, segment) pieces of the per-IP flow and ASN sequences.
+
+    Concatenating every segment for an (encoding, ip) in order gives that
+    IP's flow or ASN sequence. Each IP's rows must be in date order (as they
+    are in a date-ordered log); a day that continues into the next chunk is
+    held open until the IP's next day or the end of the file.
+
+    The flow sequences equal main.build_encoded_sequences()'s. main.py codes
+    ASNs in sorted ASN order, which a single streaming pass cannot know, so
+    the ASN sequences only match it when asn_to_char comes from main.py or
+    build_asn_mapping().
+
+    Args:
+        file_path (str): Flow log CSV.
+        chunksize (int): Rows per chunk.
+        asn_to_char (dict): Optional ASN -> code mapping (updated in place).
+            ASNs not in it get the next free code in order of first
+            appearance in the file.
+
+    Yields:
+        tuple: ("flow" or "asn", ip, segment string).
+    """
+    asn_to_char = asn_to_char if asn_to_char is not None else {}
+    open_days = {}  # ip -> [day, flow total] not yet emitted
+
+    for chunk in iter_flow_log_chunks(file_path, chunksize):
+        # ASN symbols: one lookup per distinct ASN in the chunk, then a take.
+        # The categories are sorted as strings, so new ASNs are coded in the
+        # order their first row appears, not in category order.
+        categories = chunk['r_asn'].cat.categories
+        category_codes = chunk['r_asn'].cat.codes.to_numpy()
+        present, first_rows = np.unique(category_codes, return_index=True)
+        category_symbols = np.empty(len(categories), dtype=object)
+        for k in present[np.argsort(first_rows)].tolist():
+            asn = int(categories[k])
+            if asn not in asn_to_char:
+                asn_to_char[asn] = asn_code(len(asn_to_char))
+            category_symbols[k] = asn_to_char[asn]
+        symbols = category_symbols[category_codes]
+
+        ips = chunk['l_ipn'].to_numpy()
+        days = chunk['date'].to_numpy()
+        for ip, rows in pd.Series(np.arange(len(chunk))).groupby(ips, sort=False).indices.items():
+            ip = int(ip)
+            ip_days = days[rows]
+            if len(ip_days) > 1 and (ip_days[1:] < ip_days[:-1]).any():
+                raise ValueError(f"Rows for IP {ip} are not in date order")
+            yield "asn", ip, ''.join(symbols[rows])
+
+            # Daily totals: runs of equal dates within this IP's rows
+            flows = chunk['f'].to_numpy()[rows]
+            starts = np.flatnonzero(np.concatenate(([True], ip_days[1:] != ip_days[:-1])))
+            totals = np.add.reduceat(flows.astype(np.int64), starts)
+            day_values = ip_days[starts]
+            pending = open_days.get(ip)
+            if pending is not None:
+                if day_values[0] < pending[0]:
+                    raise ValueError(f"Rows for IP {ip} are not in date order")
+                if day_values[0] == pending[0]:
+                    totals[0] += pending[1]
+                else:
+                    yield "flow", ip, flow_bucket(pending[1])
+            if len(totals) > 1:
+                yield "flow", ip, ''.join(flow_bucket(total) for total in totals[:-1].tolist())
+            open_days[ip] = [day_values[-1], int(totals[-1])]
+
+    for ip, (_, total) in open_days.items():
+        yield "flow", ip, flow_bucket(total)
+
+def build_asn_mapping(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    main.py's ASN -> code mapping (codes in sorted ASN order), from a pass
+    that reads only the r_asn column. Memory grows with the number of
+    distinct ASNs, not with the log.
+    """
+    asns = set()
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, usecols=['r_asn'], dtype={'r_asn': 'category'},
+                             compression=detect_compression(file_path)):
+        asns.update(int(asn) for asn in chunk['r_asn'].cat.categories)
+    return {asn: asn_code(i) for i, asn in enumerate(sorted(asns))}
+
+def ingest_flow_log_chunked(file_path, chunksize=DEFAULT_CHUNKSIZE, asn_to_char=None):
+    """
+    Build the per-IP flow and ASN sequences from the flow log chunk by chunk.
+
+    Returns:
+        tuple: (ip_flow_sequences, ip_asn_sequences_str, asn_to_char)
+    """
+    asn_to_char = asn_to_char if asn_to_char is not None else {}
+    segments = {"flow": {}, "asn": {}}
+    for encoding, ip, segment in iter_encoded_segments(file_path, chunksize, asn_to_char):
+        segments[encoding].setdefault(ip, []).append(segment)
+    ip_flow_sequences = {ip: ''.join(parts) for ip, parts in segments["flow"].items()}
+    ip_asn_sequences_str = {ip: ''.join(parts) for ip, parts in segments["asn"].items()}
+    return ip_flow_sequences, ip_asn_sequences_str, asn_to_char
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    file_path = "cs448b_ipasn.csv"
+    for chunksize in (1000, 10000, DEFAULT_CHUNKSIZE):
+        tracemalloc.start()
+        start = time.perf_counter()
+        flow_sequences, asn_sequences, _ = ingest_flow_log_chunked(file_path, chunksize)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"chunksize={chunksize:>7d}: {len(flow_sequences)} IPs, {elapsed:.3f}s, "
+              f"peak memory {peak / (1024 * 1024):.2f} MB")
@@ -4,13 +4,18 @@
 import time
 from collections import deque
 
-def stream_data(data, chunk_size=1):
+def stream_data(data, chunk_size=1, arrivals=None):
     """
     Simulate streaming data character by character.
+
+    If arrivals is a list, an (end_offset, perf_counter) pair is appended as
+    each chunk starts being handed out.
     """
     # print(f"Starting stream of text: '{data}'")
     for i in range(0, len(data), chunk_size):
         current_chunk = data[i : i + chunk_size]
+        if arrivals is not None:
+            arrivals.append((i + len(current_chunk), time.perf_counter()))
         for char_in_chunk in current_chunk:
             # print(f"  Stream yielding: '{char_in_chunk}'")
             yield char_in_chunk
@@ -58,11 +63,12 @@ def compute_lps_with_counts(pattern):
     return lps, lps_comparisons
 
 # --- Naive Algorithm (Streaming) ---
-def naive_stream_matching(stream, pattern):
+def naive_stream_matching(stream, pattern, match_times=None, max_matches=None):
     window = deque(maxlen=len(pattern))
     matches = []
     position = 0
     if not pattern: return []
+    if max_matches is not None and max_matches < 1: return []
     print(f"\nNaive streaming started (pattern: '{pattern}')")
     try:
         while True:
@@ -75,18 +81,23 @@ def naive_stream_matching(stream, pattern):
                 if current_window == pattern:
                     print(f"    Match found at position {position - len(pattern) + 1}")
                     matches.append(position - len(pattern) + 1)
+                    if match_times is not None:
+                        match_times.append(time.perf_counter())
+                    if max_matches is not None and len(matches) >= max_matches:
+                        break
             position += 1
     except StopIteration:
         print("  Naive reached end of stream")
         pass
     return matches
 
-def naive_stream_matching_with_counts(stream, pattern):
+def naive_stream_matching_with_counts(stream, pattern, match_times=None, max_matches=None):
     comparisons = 0
     window = deque(maxlen=len(pattern))
     matches = []
     position = 0
     if not pattern: return [], 0
+    if max_matches is not None and max_matches < 1: return [], 0
     print(f"\nNaive streaming with counts started (pattern: '{pattern}')")
     try:
         while True:
@@ -107,6 +118,10 @@ def naive_stream_matching_with_counts(stream, pattern):
                 if match_this_window:
                     # print(f"    Match found at position {position - len(pattern) + 1}")
                     matches.append(position - len(pattern) + 1)
+                    if match_times is not None:
+                        match_times.append(time.perf_counter())
+                    if max_matches is not None and len(matches) >= max_matches:
+                        break
             position += 1
     except StopIteration:
         print("  Naive reached end of stream")
@@ -115,9 +130,10 @@ def naive_stream_matching_with_counts(stream, pattern):
     return matches, comparisons
 
 # --- KMP Algorithm (Streaming - processes stream char by char) ---
-def kmp_stream_matching(stream, pattern):
+def kmp_stream_matching(stream, pattern, match_times=None, max_matches=None):
     m = len(pattern)
     if m == 0: return []
+    if max_matches is not None and max_matches < 1: return []
     lps = compute_lps(pattern)
     print(f"\nKMP streaming started (pattern: '{pattern}')")
     print(f"  Computed LPS array: {lps}")
@@ -137,6 +153,10 @@ def kmp_stream_matching(stream, pattern):
             if j == m:
                 print(f"    Complete match found at position {i - m + 1}")
                 matches.append(i - m + 1)
+                if match_times is not None:
+                    match_times.append(time.perf_counter())
+                if max_matches is not None and len(matches) >= max_matches:
+                    break
                 j = lps[j - 1]
             i += 1
     except StopIteration:
@@ -144,10 +164,16 @@ def kmp_stream_matching(stream, pattern):
         pass
     return matches
 
-def kmp_stream_matching_with_counts(stream, pattern):
+def kmp_stream_matching_with_counts(stream, pattern, match_times=None, max_matches=None, registry=None):
+    # With a PatternRegistry the LPS table is compiled once per pattern; the
+    # comparisons it took are still counted on every call so results stay comparable
     m = len(pattern)
     if m == 0: return [], 0
-    lps, lps_comparisons = compute_lps_with_counts(pattern)
+    if max_matches is not None and max_matches < 1: return [], 0
+    if registry is not None:
+        lps, lps_comparisons = registry.get(pattern, "kmp_lps_with_counts")
+    else:
+        lps, lps_comparisons = compute_lps_with_counts(pattern)
     print(f"\nKMP streaming with counts started (pattern: '{pattern}')")
     print(f"  Computed LPS array: {lps}")
     print(f"  LPS computation took {lps_comparisons} comparisons")
@@ -174,6 +200,10 @@ def kmp_stream_matching_with_counts(stream, pattern):
             if j == m:
                 # print(f"    Complete match found at position {i - m + 1}")
                 matches.append(i - m + 1)
+                if match_times is not None:
+                    match_times.append(time.perf_counter())
+                if max_matches is not None and len(matches) >= max_matches:
+                    break
                 j = lps[j - 1]
             
             i += 1
@@ -184,3 +214,180 @@ def kmp_stream_matching_with_counts(stream, pattern):
     total_comparisons = lps_comparisons + search_comparisons
     print(f"  Total comparisons: {total_comparisons} (LPS: {lps_comparisons}, Search: {search_comparisons})")
     return matches, total_comparisons
+
+# --- Chunked Streaming (one generator step per chunk instead of per character) ---
+def stream_chunks(data, chunk_size=1, arrivals=None):
+    """
+    Simulate streaming data in chunks of up to chunk_size characters.
+
+    If arrivals is a list, an (end_offset, perf_counter) pair is appended as
+    each chunk is handed to the consumer, for detection-latency measurement.
+    """
+    for i in range(0, len(data), chunk_size):
+        current_chunk = data[i : i + chunk_size]
+        if arrivals is not None:
+            arrivals.append((i + len(current_chunk), time.perf_counter()))
+        yield current_chunk
+
+def naive_feed(chunk, pattern, tail, position, matches, match_times=None, max_matches=None):
+    """
+    Run the naive window check over one chunk.
+
+    tail holds the last len(pattern) - 1 symbols of the previous chunk so that
+    matches spanning a chunk boundary are found. position is the stream offset
+    of the first symbol of tail. Returns the (tail, position) to resume from.
+    If match_times is a list, the emission time of each match is appended.
+    Once matches holds max_matches entries the rest of the chunk is skipped.
+    """
+    if max_matches is not None and len(matches) >= max_matches:
+        return tail, position
+    m = len(pattern)
+    buf = tail + chunk
+    for s in range(len(buf) - m + 1):
+        if buf[s : s + m] == pattern:
+            matches.append(position + s)
+            if match_times is not None:
+                match_times.append(time.perf_counter())
+            if max_matches is not None and len(matches) >= max_matches:
+                return buf[s + 1 : s + m], position + s + 1
+    keep = min(len(buf), m - 1)
+    return buf[len(buf) - keep :], position + len(buf) - keep
+
+def kmp_feed(chunk, pattern, lps, j, position, matches, match_times=None, max_matches=None):
+    """
+    Advance a KMP scan over one chunk.
+
+    j is the number of pattern symbols matched so far and position is the
+    stream offset of the first symbol of chunk. Returns the (j, position)
+    to resume from, so a scan can be continued across chunks. If match_times
+    is a list, the emission time of each match is appended. Once matches holds
+    max_matches entries the rest of the chunk is skipped.
+    """
+    if max_matches is not None and len(matches) >= max_matches:
+        return j, position
+    m = len(pattern)
+    for char in chunk:
+        while j > 0 and char != pattern[j]:
+            j = lps[j - 1]
+        if char == pattern[j]:
+            j += 1
+        if j == m:
+            matches.append(position - m + 1)
+            if match_times is not None:
+                match_times.append(time.perf_counter())
+            j = lps[j - 1]
+            if max_matches is not None and len(matches) >= max_matches:
+                return j, position + 1
+        position += 1
+    return j, position
+
+def naive_chunk_stream_matching(chunks, pattern, match_times=None, max_matches=None):
+    if not pattern: return []
+    if max_matches is not None and max_matches < 1: return []
+    matches = []
+    tail, position = pattern[:0], 0
+    for chunk in chunks:
+        tail, position = naive_feed(chunk, pattern, tail, position, matches, match_times, max_matches)
+        if max_matches is not None and len(matches) >= max_matches:
+            break
+    return matches
+
+def kmp_chunk_stream_matching(chunks, pattern, match_times=None, max_matches=None, registry=None):
+    if not pattern: return []
+    if max_matches is not None and max_matches < 1: return []
+    lps = registry.get(pattern, "kmp_lps") if registry is not None else compute_lps(pattern)
+    matches = []
+    j, position = 0, 0
+    for chunk in chunks:
+        j, position = kmp_feed(chunk, pattern, lps, j, position, matches, match_times, max_matches)
+        if max_matches is not None and len(matches) >= max_matches:
+            break
+    return matches
+
+# --- Early Exit (alerting) ---
+# Every engine above accepts max_matches and stops reading the stream once it
+# has that many matches (max_matches=0 returns no matches without reading the
+# stream). These wrappers cover the common alerting questions.
+def first_match(stream, pattern, engine=kmp_chunk_stream_matching):
+    """
+    Return the position of the first occurrence of pattern, or None.
+    Works with any single-pattern engine above, with or without counts.
+    """
+    result = engine(stream, pattern, max_matches=1)
+    matches = result[0] if isinstance(result, tuple) else result
+    return matches[0] if matches else None
+
+def match_exists(stream, pattern, engine=kmp_chunk_stream_matching):
+    """
+    Return True as soon as pattern is seen in the stream.
+    """
+    return first_match(stream, pattern, engine) is not None
+
+# --- Multi-pattern (Aho-Corasick) ---
+# One automaton for a whole set of patterns: each symbol costs a goto lookup
+# (plus amortized failure-link steps) however many patterns there are.
+# It reports every match of every pattern, so it takes no max_matches.
+def build_aho_corasick(patterns):
+    """
+    Compile a sequence of non-empty patterns into (goto, fail, output, lengths).
+
+    goto[state] maps a symbol to the next trie state, fail[state] is the
+    state of the longest proper suffix that is also in the trie, and
+    output[state] lists the indexes of the patterns ending at state.
+    """
+    goto, fail, output = [{}], [0], [[]]
+    for index, pattern in enumerate(patterns):
+        state = 0
+        for symbol in pattern:
+            next_state = goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][symbol] = next_state
+                goto.append({})
+                fail.append(0)
+                output.append([])
+            state = next_state
+        output[state].append(index)
+
+    queue = deque(goto[0].values())  # Depth-1 states fail to the root
+    while queue:
+        state = queue.popleft()
+        for symbol, child in goto[state].items():
+            queue.append(child)
+            fallback = fail[state]
+            while fallback and symbol not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[child] = goto[fallback].get(symbol, 0)
+            output[child] = output[child] + output[fail[child]]
+    return goto, fail, output, [len(pattern) for pattern in patterns]
+
+def aho_corasick_feed(chunk, automaton, state, position, matches):
+    """
+    Advance an Aho-Corasick scan over one chunk, appending (pattern_index,
+    start) pairs to matches. Returns the (state, position) to resume from.
+    """
+    goto, fail, output, lengths = automaton
+    for symbol in chunk:
+        while state and symbol not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(symbol, 0)
+        if output[state]:
+            for index in output[state]:
+                matches.append((index, position - lengths[index] + 1))
+        position += 1
+    return state, position
+
+def aho_corasick_chunk_stream_matching(chunks, patterns, automaton=None):
+    """
+    Find every occurrence of every pattern in one pass over the chunks.
+
+    Returns:
+        list: (pattern_index, start) pairs in order of match end position.
+    """
+    if automaton is None:
+        automaton = build_aho_corasick(patterns)
+    matches = []
+    state, position = 0, 0
+    for chunk in chunks:
+        state, position = aho_corasick_feed(chunk, automaton, state, position, matches)
+    return matches
@@ -1,46 +1,98 @@
 import random
 import os
+import shutil
+import tempfile
 import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 
-def augment_sequence(original_sequence, target_length_chars):
+import numpy as np
+
+from packed_sequence import PackedFileWriter, PACKED_EXTENSION, PACKED_HEADER_SIZE, infer_alphabet
+
+# Symbols produced per block by the streaming generators (a multiple of 4, so
+# blocks can be packed 2 bits per symbol)
+GENERATION_BLOCK_CHARS = 1 << 20
+
+def default_rng(rng=None):
     """
-    Augments a sequence to a target length by repeating and shuffling.
+    The given NumPy Generator, or one seeded from the global random state so
+    random.seed() keeps generation reproducible.
+    """
+    return rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+
+def _symbol_array(sequence):
+    # ASCII sequences (all flow/ASN encodings) use one byte per symbol
+    if sequence.isascii():
+        return np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    return np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+
+def _symbols_to_str(symbols):
+    if symbols.dtype == np.uint8:
+        return symbols.tobytes().decode('ascii')
+    return symbols.tobytes().decode('utf-32-le')
+
+def iter_augmented_blocks(original_sequence, target_length_chars, rng=None,
+                          block_chars=GENERATION_BLOCK_CHARS):
+    """
+    Yield an augmented sequence of target_length_chars symbols in blocks of
+    about block_chars symbols: independently shuffled copies of the original
+    sequence, concatenated and truncated. Memory use is bounded by the block
+    size, not the target length.
     """
     if not original_sequence:
         # If the original sequence is empty, return a sequence of 'a's
         # or handle as an error. For now, fill with 'a'.
         print("Warning: Original sequence is empty. Filling with 'a'.")
-        return 'a' * target_length_chars
+        for start in range(0, target_length_chars, block_chars):
+            yield 'a' * min(block_chars, target_length_chars - start)
+        return
     if target_length_chars <= 0:
-        return ""
+        return
 
-    augmented_seq = []
-    original_list = list(original_sequence)
-    
-    while len(augmented_seq) < target_length_chars:
-        # Append a shuffled version of the original sequence
-        # or parts of it to introduce some variability.
-        # For very long target lengths, repeating the original is inevitable.
-        chunk = original_list[:] # Make a copy
-        random.shuffle(chunk)
-        augmented_seq.extend(chunk)
-        
-    return "".join(augmented_seq[:target_length_chars])
+    rng = default_rng(rng)
+    symbols = _symbol_array(original_sequence)
+    # A multiple of 4 copies keeps every block but the last packable
+    copies_per_block = max(4, block_chars // len(symbols) // 4 * 4)
+    copies = np.tile(symbols, (copies_per_block, 1))
+    remaining = target_length_chars
+    while remaining > 0:
+        # One row per copy, each row shuffled independently
+        block = rng.permuted(copies, axis=1).ravel()
+        if len(block) > remaining:
+            block = block[:remaining]
+        remaining -= len(block)
+        yield _symbols_to_str(block)
 
-def generate_large_flow_file(original_file_path, target_mb_size, output_file_path):
+def augment_sequence(original_sequence, target_length_chars, rng=None):
     """
-    Generates a large flow sequence file by augmenting sequences from the original file.
+    Augments a sequence to a target length by repeating and shuffling.
+    """
+    return "".join(iter_augmented_blocks(original_sequence, target_length_chars, rng))
+
+def shard_rng(seed, target_mb_size, ip_index):
+    """
+    Independent random stream for one (file size, IP) shard of a seeded run.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(target_mb_size, ip_index)))
+
+def plan_flow_file(original_file_path, target_mb_size):
+    """
+    Read the original sequences and work out how many characters each IP
+    needs for a text file of target_mb_size.
+
+    Returns:
+        tuple: ({ip: original sequence}, chars_per_ip_sequence), or None on error.
     """
     try:
         with open(original_file_path, 'r', encoding='utf-8') as f:
             lines = f.readlines()
     except FileNotFoundError:
         print(f"Error: Original file '{original_file_path}' not found.")
-        return
+        return None
 
     if not lines:
         print(f"Error: Original file '{original_file_path}' is empty.")
-        return
+        return None
 
     ip_original_sequences = {}
     for line in lines:
@@ -56,7 +108,7 @@ def generate_large_flow_file(original_file_path, target_mb_size, output_file_pat
     
     if not ip_original_sequences:
         print("Error: No valid IP sequences found in the original file.")
-        return
+        return None
 
     num_ips = len(ip_original_sequences)
     target_total_bytes = target_mb_size * 1024 * 1024
@@ -70,35 +122,155 @@ def generate_large_flow_file(original_file_path, target_mb_size, output_file_pat
 
     if target_total_bytes <= total_overhead_bytes:
         print(f"Error: Target size {target_mb_size}MB is too small to accommodate IP prefixes for {num_ips} IPs.")
-        return
+        return None
         
     target_sequence_bytes_total = target_total_bytes - total_overhead_bytes
     chars_per_ip_sequence = int(target_sequence_bytes_total / num_ips)
 
     if chars_per_ip_sequence <= 0:
         print(f"Error: Calculated characters per IP sequence is non-positive ({chars_per_ip_sequence}). Target size might be too small relative to the number of IPs and overhead.")
+        return None
+
+    return ip_original_sequences, chars_per_ip_sequence
+
+def write_flow_sequence(outfile, ip_str, original_seq, length, rng):
+    """
+    Write one 'ip: sequence' line, generating the sequence block by block.
+    """
+    outfile.write(f"{ip_str}: ")
+    for block in iter_augmented_blocks(original_seq, length, rng):
+        outfile.write(block)
+    outfile.write("\n")
+
+def generate_large_flow_file(original_file_path, target_mb_size, output_file_path, packed=False, rng=None,
+                             seed=None):
+    """
+    Generates a large flow sequence file by augmenting sequences from the original file.
+
+    target_mb_size is the size of the equivalent text file. With packed=True the
+    sequences are written 2 bits per symbol (see packed_sequence.py) instead of
+    as 'ip: sequence' lines, giving a file about a quarter of that size.
+    rng is an optional numpy.random.Generator. With a seed, each IP instead
+    gets its own shard_rng() stream, so the output is identical to
+    generate_flow_files_parallel() with the same seed.
+    """
+    plan = plan_flow_file(original_file_path, target_mb_size)
+    if plan is None:
         return
+    ip_original_sequences, chars_per_ip_sequence = plan
 
     print(f"Generating '{output_file_path}' ({target_mb_size}MB)...")
     print(f"  Target characters per IP sequence: {chars_per_ip_sequence}")
 
-    with open(output_file_path, 'w', encoding='utf-8') as outfile:
-        for ip_str, original_seq in ip_original_sequences.items():
-            augmented_seq = augment_sequence(original_seq, chars_per_ip_sequence)
-            outfile.write(f"{ip_str}: {augmented_seq}\n")
+    # Each sequence is written block by block as it is generated
+    rng = default_rng(rng) if seed is None else None
+    if packed:
+        with PackedFileWriter(output_file_path) as writer:
+            for ip_index, (ip_str, original_seq) in enumerate(ip_original_sequences.items()):
+                ip_rng = rng or shard_rng(seed, target_mb_size, ip_index)
+                writer.add_blocks(ip_str, iter_augmented_blocks(original_seq, chars_per_ip_sequence, ip_rng),
+                                  chars_per_ip_sequence, infer_alphabet(original_seq or 'a'))
+    else:
+        with open(output_file_path, 'w', encoding='utf-8') as outfile:
+            for ip_index, (ip_str, original_seq) in enumerate(ip_original_sequences.items()):
+                ip_rng = rng or shard_rng(seed, target_mb_size, ip_index)
+                write_flow_sequence(outfile, ip_str, original_seq, chars_per_ip_sequence, ip_rng)
     
     print(f"Successfully generated '{output_file_path}' (Actual size: {os.path.getsize(output_file_path) / (1024*1024):.2f}MB)")
 
-def generate_synthetic_sequence(sequences, min_length=10000, max_length=100000):
-    length = random.randint(min_length, max_length)
-    synthetic_sequence = ''
-    while len(synthetic_sequence) < length:
-        seq = random.choice(sequences)
-        part = seq[:min(length - len(synthetic_sequence), len(seq))]
-        synthetic_sequence += part
-    return synthetic_sequence
+def _generate_shard(shard):
+    """
+    Process pool worker: write one (size, IP) sequence to its own shard file.
+    """
+    shard_path, seed, target_mb_size, ip_index, ip_str, original_seq, length, packed = shard
+    rng = shard_rng(seed, target_mb_size, ip_index)
+    if packed:
+        with PackedFileWriter(shard_path) as writer:
+            writer.add_blocks(ip_str, iter_augmented_blocks(original_seq, length, rng),
+                              length, infer_alphabet(original_seq or 'a'))
+    else:
+        with open(shard_path, 'w', encoding='utf-8') as outfile:
+            write_flow_sequence(outfile, ip_str, original_seq, length, rng)
+    return shard_path
+
+def generate_flow_files_parallel(original_file_path, target_sizes_mb, seed, workers=None, packed=False,
+                                 output_template="flow_sequences_{size_mb}mb{extension}"):
+    """
+    Generate one augmented file per size, splitting the work across a process
+    pool by (size, IP).
+
+    Every shard draws from shard_rng(seed, size, ip_index), and shards are
+    stitched together in IP order, so a given seed produces byte-identical
+    files whatever the number of workers (and the same files as
+    generate_large_flow_file(..., seed=seed)).
+
+    Returns:
+        list: Paths of the generated files.
+    """
+    extension = PACKED_EXTENSION if packed else ".txt"
+    plans = {}
+    for size_mb in target_sizes_mb:
+        plan = plan_flow_file(original_file_path, size_mb)
+        if plan is not None:
+            plans[size_mb] = plan
+    if not plans:
+        return []
+
+    output_paths = {size_mb: output_template.format(size_mb=size_mb, extension=extension) for size_mb in plans}
+    # Shards live next to the outputs so stitching never crosses filesystems
+    shard_dir = tempfile.mkdtemp(prefix=".shards_", dir=os.path.dirname(output_paths[next(iter(plans))]) or ".")
+    try:
+        shards = {size_mb: [] for size_mb in plans}
+        for size_mb, (ip_original_sequences, chars_per_ip_sequence) in plans.items():
+            for ip_index, (ip_str, original_seq) in enumerate(ip_original_sequences.items()):
+                shard_path = os.path.join(shard_dir, f"{size_mb}_{ip_index}")
+                shards[size_mb].append((shard_path, seed, size_mb, ip_index, ip_str, original_seq,
+                                        chars_per_ip_sequence, packed))
+
+        all_shards = [shard for size_shards in shards.values() for shard in size_shards]
+        print(f"Generating {len(plans)} files as {len(all_shards)} shards (seed {seed})...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(_generate_shard, all_shards):
+                pass
 
-def generate_synthetic_dataset(input_file, output_file, num_sequences=1000, max_file_size=10 * 1024 * 1024):
+        for size_mb, size_shards in shards.items():
+            with open(output_paths[size_mb], 'wb') as outfile:
+                if packed:
+                    with open(size_shards[0][0], 'rb') as shard_file:
+                        outfile.write(shard_file.read(PACKED_HEADER_SIZE))
+                for shard in size_shards:
+                    with open(shard[0], 'rb') as shard_file:
+                        # Each packed shard repeats the file header; keep only the record
+                        shard_file.seek(PACKED_HEADER_SIZE if packed else 0)
+                        shutil.copyfileobj(shard_file, outfile)
+            print(f"Successfully generated '{output_paths[size_mb]}' "
+                  f"(Actual size: {os.path.getsize(output_paths[size_mb]) / (1024*1024):.2f}MB)")
+    finally:
+        shutil.rmtree(shard_dir)
+    return list(output_paths.values())
+
+def iter_synthetic_sequence(sequences, length, rng=None):
+    """
+    Yield the pieces of a synthetic sequence of the given length: prefixes of
+    randomly chosen source sequences, concatenated.
+    """
+    rng = default_rng(rng)
+    sequences = [seq for seq in sequences if seq]
+    remaining = length
+    while remaining > 0 and sequences:
+        seq = sequences[rng.integers(len(sequences))]
+        part = seq[:remaining]
+        remaining -= len(part)
+        yield part
+
+def generate_synthetic_sequence(sequences, min_length=10000, max_length=100000, rng=None):
+    rng = default_rng(rng)
+    length = int(rng.integers(min_length, max_length, endpoint=True))
+    return ''.join(iter_synthetic_sequence(sequences, length, rng))
+
+def generate_synthetic_dataset(input_file, output_file, num_sequences=1000, max_file_size=10 * 1024 * 1024,
+                               min_length=10000, max_length=100000, rng=None):
+    rng = default_rng(rng)
     sequences = []
     with open(input_file, 'r') as file:
         for line in file:
@@ -108,30 +280,48 @@ def generate_synthetic_dataset(input_file, output_file, num_sequences=1000, max_
                 sequences.append(seq.strip())
             else:
                 sequences.append(line.strip())
+    written = 0
     with open(output_file, 'w') as file:
         for _ in range(num_sequences):
-            synthetic_sequence = generate_synthetic_sequence(sequences)
-            if file.tell() + len(synthetic_sequence) > max_file_size:
+            # The length is drawn first so the size limit is checked before
+            # anything is generated; the sequence itself is streamed to the file
+            length = int(rng.integers(min_length, max_length, endpoint=True))
+            if written + length > max_file_size:
                 break
-            file.write(synthetic_sequence + '\n')
+            for part in iter_synthetic_sequence(sequences, length, rng):
+                file.write(part)
+            file.write('\n')
+            written += length + 1
     print(f"Generated synthetic dataset saved to {output_file}")
 
 if __name__ == "__main__":
     original_file = "flow_sequences.txt" # Make sure this file exists in the same directory or provide full path
     target_sizes_mb = [10, 20, 30, 40, 50] # Define the target file sizes in MB
+    write_packed = False # Also write 2-bit packed copies (flow_sequences_<size>mb.2bit)
+    master_seed = 448 # Same seed -> byte-identical corpora; None for unseeded sequential generation
+    workers = None # Process pool size (None: one per CPU)
 
     if not os.path.exists(original_file):
         print(f"Error: The input file '{original_file}' does not exist in the current directory: {os.getcwd()}")
         print("Please create it or provide the correct path.")
+    elif master_seed is not None:
+        generate_flow_files_parallel(original_file, target_sizes_mb, master_seed, workers)
+        if write_packed:
+            generate_flow_files_parallel(original_file, target_sizes_mb, master_seed, workers, packed=True)
+        print("\nAll files generated.")
     else:
         for size_mb in target_sizes_mb:
             output_filename = f"flow_sequences_{size_mb}mb.txt"
             generate_large_flow_file(original_file, size_mb, output_filename)
+            if write_packed:
+                generate_large_flow_file(original_file, size_mb,
+                                         f"flow_sequences_{size_mb}mb{PACKED_EXTENSION}", packed=True)
         print("\nAll files generated.")
 
     # --- Synthetic sequence generation with memory measurement ---
     tracemalloc.start()
-    generate_synthetic_dataset(original_file, 'synthetic_sequences.txt')
+    synthetic_rng = np.random.default_rng(master_seed) if master_seed is not None else None
+    generate_synthetic_dataset(original_file, 'synthetic_sequences.txt', rng=synthetic_rng)
     current, peak = tracemalloc.get_traced_memory()
     print(f"Peak memory usage for synthetic generation: {peak / (1024 * 1024):.2f} MB")
-    tracemalloc.stop() 
\ No newline at end of file
+    tracemalloc.stop()
@@ -0,0 +1,141 @@
+## Time-ordered, interleaved multi-IP replay
+# Streams cs448b_ipasn.csv rows in date order, the way the flow log arrives,
+# and routes each encoded symbol to that IP's matcher state. No per-IP string
+# is ever built: each IP keeps only [position, j_0, j_1, ...], one KMP
+# state per pattern.
+
+import csv
+import time
+
+import pandas as pd
+
+from functions import compute_lps, kmp_feed
+from main import compromise_info, flow_bucket, asn_code
+from compressed_input import detect_compression, open_input
+
+def iter_flow_log_records(file_path):
+    """
+    Yield (date, l_ipn, r_asn, f) records from the flow log in file order.
+
+    Dates are kept as ISO strings, which sort in calendar order.
+    """
+    with open_input(file_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date_col = header.index('date')
+        ip_col = header.index('l_ipn')
+        asn_col = header.index('r_asn')
+        flow_col = header.index('f')
+        for row in reader:
+            if not row:
+                continue
+            yield row[date_col], int(row[ip_col]), int(row[asn_col]), int(row[flow_col])
+
+def replay_interleaved(records, patterns, encoding="flow", asn_to_char=None):
+    """
+    Match every pattern against every IP's sequence as date-ordered records arrive.
+
+    For encoding="flow" an IP's symbol for a day is flow_bucket() of its daily
+    flow total, emitted once the replay moves past that day. For
+    encoding="asn" each record emits the ASN's code straight away. ASNs missing
+    from asn_to_char are assigned the next free code in order of first
+    appearance, since the full ASN set is not known up front.
+
+    Positions are offsets into the same per-IP sequences main.py builds, so
+    results can be compared directly.
+
+    Args:
+        records: Iterable of (date, l_ipn, r_asn, f), in non-decreasing date order.
+        patterns (dict): Pattern name -> pattern string, tested against all IPs.
+        encoding (str): "flow" or "asn".
+        asn_to_char (dict): Optional ASN -> code mapping (updated in place).
+
+    Yields:
+        tuple: (date, ip, pattern_name, position) for each match, online.
+    """
+    if encoding not in ("flow", "asn"):
+        raise ValueError(f"Unknown encoding '{encoding}'")
+    compiled = [(name, pattern, compute_lps(pattern)) for name, pattern in patterns.items() if pattern]
+    asn_to_char = asn_to_char if asn_to_char is not None else {}
+    states = {}
+    pending_flows = {}
+    current_date = None
+
+    def advance(ip, symbol, date):
+        state = states.get(ip)
+        if state is None:
+            state = states[ip] = [0] * (len(compiled) + 1)
+        position = state[0]
+        found = []
+        for k, (name, pattern, lps) in enumerate(compiled):
+            matches = []
+            state[k + 1], _ = kmp_feed(symbol, pattern, lps, state[k + 1], position, matches)
+            found.extend((date, ip, name, match) for match in matches)
+        state[0] = position + len(symbol)
+        return found
+
+    for date, ip, asn, flows in records:
+        if current_date is not None and date < current_date:
+            raise ValueError(f"Records are not in date order ({date} after {current_date})")
+        if encoding == "flow":
+            if date != current_date and pending_flows:
+                for day_ip, total in pending_flows.items():
+                    yield from advance(day_ip, flow_bucket(total), current_date)
+                pending_flows.clear()
+            pending_flows[ip] = pending_flows.get(ip, 0) + flows
+        else:
+            symbol = asn_to_char.get(asn)
+            if symbol is None:
+                symbol = asn_to_char[asn] = asn_code(len(asn_to_char))
+            yield from advance(ip, symbol, date)
+        current_date = date
+
+    for day_ip, total in pending_flows.items():
+        yield from advance(day_ip, flow_bucket(total), current_date)
+
+def run_replay(file_path, patterns, encoding="flow", asn_to_char=None):
+    """
+    Replay the whole flow log and measure throughput.
+
+    Returns:
+        tuple: (matches, records_processed, elapsed_sec, records_per_sec)
+    """
+    processed = [0]
+    def counted(records):
+        for record in records:
+            processed[0] += 1
+            yield record
+
+    start = time.perf_counter()
+    matches = list(replay_interleaved(counted(iter_flow_log_records(file_path)),
+                                      patterns, encoding, asn_to_char))
+    elapsed = time.perf_counter() - start
+    records_per_sec = processed[0] / elapsed if elapsed > 0 else float('inf')
+    return matches, processed[0], elapsed, records_per_sec
+
+def main():
+    file_path = "cs448b_ipasn.csv"
+    window_days = 7
+
+    # Compromise-window patterns as in main.py, tested against every IP
+    df = pd.read_csv(file_path, compression=detect_compression(file_path))
+    df['date'] = pd.to_datetime(df['date'])
+    asn_to_char = {asn: asn_code(i) for i, asn in enumerate(sorted(df['r_asn'].unique()))}
+    flow_patterns = {}
+    asn_patterns = {}
+    for ip, date_str in compromise_info.items():
+        compromise_date = pd.to_datetime(date_str)
+        start_date = compromise_date - pd.Timedelta(days=window_days)
+        window = df[(df['l_ipn'] == ip) & (df['date'] >= start_date) & (df['date'] < compromise_date)]
+        daily = window.groupby('date')['f'].sum().sort_index()
+        flow_patterns[ip] = ''.join(flow_bucket(f) for f in daily)
+        asn_patterns[ip] = ''.join(asn_to_char[asn] for asn in window.sort_values('date', kind='stable')['r_asn'])
+
+    for label, encoding, patterns in (("Flow", "flow", flow_patterns), ("ASN", "asn", asn_patterns)):
+        matches, records, elapsed, rps = run_replay(file_path, patterns, encoding, dict(asn_to_char))
+        print(f"{label}: {records} records in {elapsed:.4f}s ({rps:,.0f} records/s), {len(matches)} matches")
+        for date, ip, pattern_ip, position in matches[:5]:
+            print(f"  {date}: pattern IP {pattern_ip} matched target IP {ip} at position {position}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import pandas as pd
+import numpy as np
+from array import array
 from collections import defaultdict
 import time
 import csv
+from functools import partial
 # from memory_profiler import memory_usage # Keep if you're still using it, otherwise remove
 
 # Correctly import the STREAMING KMP versions from functions.py
@@ -10,69 +13,71 @@ from functions import (
     naive_stream_matching_with_counts,  # Or naive_stream_matching if not counting
     kmp_stream_matching_with_counts     # Or kmp_stream_matching if not counting
 )
+from sequence_index import FlowLogIndex, PositionDateIndex
+from sequence_cache import DEFAULT_CACHE_DIR, load_or_build, source_fingerprint
+from compressed_input import detect_compression
+from result_cache import MatchResultCache
+from pattern_registry import PatternRegistry
 
-def main():
-    # Debug test with a very small example first
-    print("\n=== STREAMING ALGORITHM VERIFICATION TEST ===")
-    test_text = "hxxxxxxm"      # A small sample from your flow data
-    test_pattern = "xxx"        # A pattern we expect to find
-    
-    print(f"\nTest Case:")
-    print(f"Text: '{test_text}' (length: {len(test_text)})")
-    print(f"Pattern: '{test_pattern}' (length: {len(test_pattern)})")
-    
-    # Test Naive Streaming
-    print("\n--- Testing Naive Streaming Algorithm ---")
-    stream_for_naive = stream_data(test_text)
-    naive_matches, naive_comps = naive_stream_matching_with_counts(stream_for_naive, test_pattern)
-    print(f"Naive found {len(naive_matches)} matches at positions: {naive_matches}")
-    print(f"Naive made {naive_comps} character comparisons")
-    
-    # Test KMP Streaming
-    print("\n--- Testing KMP Streaming Algorithm ---")
-    stream_for_kmp = stream_data(test_text)
-    kmp_matches, kmp_comps = kmp_stream_matching_with_counts(stream_for_kmp, test_pattern)
-    print(f"KMP found {len(kmp_matches)} matches at positions: {kmp_matches}")
-    print(f"KMP made {kmp_comps} character comparisons")
-    
-    print("\n=== END VERIFICATION TEST ===")
-    print("\nProceeding with full dataset analysis...")
+# Define known compromise dates and IPs
+compromise_info = {
+    1: "2006-08-24",
+    5: "2006-09-04",
+    4: "2006-09-18",
+    3: "2006-09-26",
+    6: "2006-09-26"
+}
 
-    file_path = "cs448b_ipasn.csv"
-    df = pd.read_csv(file_path)
-
-    compromise_info = {
-        1: "2006-08-24",
-        5: "2006-09-04",
-        4: "2006-09-18",
-        3: "2006-09-26",
-        6: "2006-09-26"
-    }
+# Define buckets: a = low, b = medium, c = high, d = very high
+def flow_bucket(f):
+    if f < 10:
+        return 'a'
+    elif f < 100:
+        return 'b'
+    elif f < 1000:
+        return 'c'
+    else:
+        return 'd'
+
+# ASN i -> 'A'..'Z' for the first 26, then letter + (i // 26), e.g. 'C12'
+def asn_code(i):
+    return chr(65 + i % 26) + (str(i // 26) if i // 26 > 0 else '')
+
+def build_encoded_sequences(file_path, window_days=7):
+    """
+    Build the per-IP flow-level and ASN sequences, their date indexes and the
+    compromise-window patterns from the flow log.
+
+    Returns:
+        dict: ip_flow_sequences, ip_flow_date_index, flow_patterns_data,
+        asn_to_char, ip_asn_sequences_str, ip_asn_date_index, asn_patterns_data
+    """
+    df = pd.read_csv(file_path, compression=detect_compression(file_path))
 
     df['date'] = pd.to_datetime(df['date'])
     df_sorted = df.sort_values(by=['l_ipn', 'date'])
 
     daily_flows = df.groupby(['l_ipn', 'date'])['f'].sum().reset_index()
 
-    x
-
     daily_flows['flow_level'] = daily_flows['f'].apply(flow_bucket)
 
+    # Companion date indexes let match offsets resolve to calendar days
     ip_flow_sequences = defaultdict(str)
+    ip_flow_date_index = defaultdict(PositionDateIndex)
     for _, row in daily_flows.iterrows():
         ip = row['l_ipn']
+        ip_flow_date_index[ip].append(row['date'], len(ip_flow_sequences[ip]))
         ip_flow_sequences[ip] += row['flow_level']
 
+    # Per-IP, date-sorted index: each compromise window below is a binary
+    # search plus a slice rather than a scan of the whole DataFrame
+    flow_log_index = FlowLogIndex(df)
+
     flow_patterns_data = {}
-    window_days = 7
     for ip, date_str in compromise_info.items():
         compromise_date = pd.to_datetime(date_str)
         start_date = compromise_date - pd.Timedelta(days=window_days)
-
-        flow_segment = df[df['l_ipn'] == ip].groupby(['date'])['f'].sum().reset_index()
-        flow_segment = flow_segment[(flow_segment['date'] >= start_date) & (flow_segment['date'] < compromise_date)]
-        flow_segment['flow_level'] = flow_segment['f'].apply(flow_bucket)
-        flow_pattern_str = ''.join(flow_segment.sort_values('date')['flow_level'].tolist())
+        flow_pattern_str = flow_log_index.flow_pattern(ip, start_date, compromise_date, flow_bucket)
         if flow_pattern_str:
             flow_patterns_data[ip] = flow_pattern_str
 
@@ -80,25 +85,151 @@ def main():
     unique_asns = df_sorted['r_asn'].unique()
     # Create a consistent mapping for ASN characters
     sorted_unique_asns = sorted(list(unique_asns))
-    asn_to_char = {asn: chr(65 + i % 26) + (str(i // 26) if i // 26 > 0 else '') for i, asn in enumerate(sorted_unique_asns)}
+    asn_to_char = {asn: asn_code(i) for i, asn in enumerate(sorted_unique_asns)}
 
     ip_asn_sequences_str = defaultdict(str)
+    ip_asn_date_index = defaultdict(PositionDateIndex)
     for _, row in df_sorted.iterrows():
-        ip_asn_sequences_str[row['l_ipn']] += asn_to_char[row['r_asn']]
+        ip = row['l_ipn']
+        ip_asn_date_index[ip].append(row['date'], len(ip_asn_sequences_str[ip]))
+        ip_asn_sequences_str[ip] += asn_to_char[row['r_asn']]
 
     asn_patterns_data = {}
     for ip, date_str in compromise_info.items():
         compromise_date = pd.to_datetime(date_str)
         start_date = compromise_date - pd.Timedelta(days=window_days)
-        asn_df_segment = df_sorted[
-            (df_sorted['l_ipn'] == ip) &
-            (df_sorted['date'] >= start_date) &
-            (df_sorted['date'] < compromise_date)
-        ]
-        # Ensure r_asn exists in asn_to_char, skip if not (should not happen with above generation)
-        asn_pattern_str = ''.join([asn_to_char[asn] for asn in asn_df_segment['r_asn'] if asn in asn_to_char])
+        asn_pattern_str = flow_log_index.asn_pattern(ip, start_date, compromise_date, asn_to_char)
         if asn_pattern_str:
             asn_patterns_data[ip] = asn_pattern_str
+
+    return {
+        "ip_flow_sequences": ip_flow_sequences,
+        "ip_flow_date_index": ip_flow_date_index,
+        "flow_patterns_data": flow_patterns_data,
+        "asn_to_char": asn_to_char,
+        "ip_asn_sequences_str": ip_asn_sequences_str,
+        "ip_asn_date_index": ip_asn_date_index,
+        "asn_patterns_data": asn_patterns_data
+    }
+
+def build_asn_token_sequences(file_path, window_days=7):
+    """
+    Build per-IP ASN sequences as integer token arrays, one symbol per connection.
+
+    Token i is the i-th ASN in sorted order (the same numbering asn_code uses),
+    stored as array('H') when every token fits in 16 bits, else array('I').
+    Unlike the variable-width string codes, a match can never straddle two
+    tokens.
+
+    Returns:
+        dict: ip_asn_tokens, asn_to_token, asn_token_patterns
+    """
+    df = pd.read_csv(file_path, compression=detect_compression(file_path))
+    df['date'] = pd.to_datetime(df['date'])
+    flow_log_index = FlowLogIndex(df)
+
+    sorted_unique_asns = np.unique(flow_log_index.row_asn)
+    asn_to_token = {asn.item(): i for i, asn in enumerate(sorted_unique_asns)}
+    typecode = 'H' if len(sorted_unique_asns) <= 0xFFFF else 'I'
+    token_dtype = np.uint16 if typecode == 'H' else np.uint32
+    all_tokens = np.searchsorted(sorted_unique_asns, flow_log_index.row_asn).astype(token_dtype)
+
+    ip_asn_tokens = {}
+    for ip, (start, end) in flow_log_index.ip_rows.items():
+        ip_asn_tokens[ip] = array(typecode, all_tokens[start:end].tobytes())
+
+    asn_token_patterns = {}
+    for ip, date_str in compromise_info.items():
+        compromise_date = pd.to_datetime(date_str)
+        start_date = compromise_date - pd.Timedelta(days=window_days)
+        window = flow_log_index.asn_window(ip, start_date, compromise_date)
+        if len(window):
+            asn_token_patterns[ip] = array(typecode, (asn_to_token[asn] for asn in window.tolist()))
+
+    return {
+        "ip_asn_tokens": ip_asn_tokens,
+        "asn_to_token": asn_to_token,
+        "asn_token_patterns": asn_token_patterns
+    }
+
+def load_encoded_sequences(file_path, window_days=7, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    build_encoded_sequences() behind the on-disk cache: a warm start with an
+    unchanged flow log, parameters and builder code skips pandas
+    preprocessing entirely.
+    """
+    params = {
+        # Editing the bucketing, ASN coding, builder or index classes
+        # invalidates cached encodings built with the old rules
+        "builder": source_fingerprint(flow_bucket, asn_code, build_encoded_sequences,
+                                      PositionDateIndex, FlowLogIndex),
+        "window_days": window_days,
+        "compromise_info": compromise_info
+    }
+    return load_or_build([file_path], params, lambda: build_encoded_sequences(file_path, window_days),
+                         cache_dir=cache_dir, label="encoded sequences")
+
+def timed_stream_match(engine, text, pattern):
+    """
+    Run a counting engine over stream_data(text).
+
+    Returns:
+        tuple: (matches, comparisons, time_sec)
+    """
+    stream = stream_data(text)
+    start = time.perf_counter()
+    matches, comparisons = engine(stream, pattern)
+    return matches, comparisons, time.perf_counter() - start
+
+def main(result_cache_dir=None):
+    """
+    Args:
+        result_cache_dir (str): Directory for the result cache's disk tier
+            (e.g. result_cache.DEFAULT_RESULT_CACHE_DIR). Off by default, so
+            every run scans and times its own rows.
+    """
+    # Debug test with a very small example first
+    print("\n=== STREAMING ALGORITHM VERIFICATION TEST ===")
+    test_text = "hxxxxxxm"      # A small sample from your flow data
+    test_pattern = "xxx"        # A pattern we expect to find
+    
+    print(f"\nTest Case:")
+    print(f"Text: '{test_text}' (length: {len(test_text)})")
+    print(f"Pattern: '{test_pattern}' (length: {len(test_pattern)})")
+    
+    # Test Naive Streaming
+    print("\n--- Testing Naive Streaming Algorithm ---")
+    stream_for_naive = stream_data(test_text)
+    naive_matches, naive_comps = naive_stream_matching_with_counts(stream_for_naive, test_pattern)
+    print(f"Naive found {len(naive_matches)} matches at positions: {naive_matches}")
+    print(f"Naive made {naive_comps} character comparisons")
+    
+    # Test KMP Streaming
+    print("\n--- Testing KMP Streaming Algorithm ---")
+    stream_for_kmp = stream_data(test_text)
+    kmp_matches, kmp_comps = kmp_stream_matching_with_counts(stream_for_kmp, test_pattern)
+    print(f"KMP found {len(kmp_matches)} matches at positions: {kmp_matches}")
+    print(f"KMP made {kmp_comps} character comparisons")
+    
+    print("\n=== END VERIFICATION TEST ===")
+    print("\nProceeding with full dataset analysis...")
+
+    file_path = "cs448b_ipasn.csv"
+    encoded = load_encoded_sequences(file_path)
+    ip_flow_sequences = encoded["ip_flow_sequences"]
+    ip_flow_date_index = encoded["ip_flow_date_index"]
+    flow_patterns_data = encoded["flow_patterns_data"]
+    ip_asn_sequences_str = encoded["ip_asn_sequences_str"]
+    ip_asn_date_index = encoded["ip_asn_date_index"]
+    asn_patterns_data = encoded["asn_patterns_data"]
+    # Identical (engine, pattern, text) scans, e.g. the same pattern against
+    # duplicate sequences, are answered from the cache. Cached rows are marked
+    # in the CSV and have no timing, since nothing ran for them.
+    result_cache = MatchResultCache(disk_dir=result_cache_dir)
+    # Each pattern's LPS table is compiled once and reused for every target
+    pattern_registry = PatternRegistry()
+    kmp_engine = partial(kmp_stream_matching_with_counts, registry=pattern_registry)
+
             
     # --- CSV Output Preparation ---
     # Added peak_memory_mb columns back, assuming memory_profiler might be used later or data is fine as 0
@@ -107,11 +238,22 @@ def main():
         "text_length", "pattern_length",
         "naive_match_count", "naive_time_sec", "naive_comparisons", "naive_peak_memory_mb",
         "kmp_match_count", "kmp_time_sec", "kmp_comparisons", "kmp_peak_memory_mb",
-        "kmp_speedup_ratio_time", "kmp_reduction_ratio_comps"
+        "kmp_speedup_ratio_time", "kmp_reduction_ratio_comps",
+        "kmp_first_match_dates", "kmp_last_match_dates",
+        "naive_cached", "kmp_cached"
     ]
 
     # --- Function to run tests and collect results ---
-    def run_matching_tests(patterns_dict, sequences_dict, data_type_label):
+    def describe_match_dates(date_index, matches, pattern_length, k):
+        if date_index is None or not matches:
+            return ""
+        first_day, last_day = date_index.date_range(matches[k], pattern_length)
+        return f"{first_day} to {last_day}"
+
+    def describe_time(elapsed):
+        return "cached" if elapsed is None else f"{elapsed:.6f}s"
+
+    def run_matching_tests(patterns_dict, sequences_dict, data_type_label, date_indexes=None):
         output_rows_list = []
         print(f"\nRunning tests for {data_type_label} data...")
         for pattern_ip, current_pattern in patterns_dict.items():
@@ -142,32 +284,34 @@ def main():
                 
                 text_length = len(current_text)
                 pattern_length = len(current_pattern)
+                date_index = date_indexes.get(target_ip) if date_indexes else None
 
                 # --- Naive matching (streaming) ---
-                stream_for_naive = stream_data(current_text) # Create stream
-                start_naive = time.perf_counter()
-                naive_matches, naive_comps = naive_stream_matching_with_counts(stream_for_naive, current_pattern)
-                naive_time = time.perf_counter() - start_naive
+                (naive_matches, naive_comps), naive_time, naive_cached = result_cache.get_or_time(
+                    "naive_stream_with_counts", naive_stream_matching_with_counts, current_pattern, current_text,
+                    lambda: timed_stream_match(naive_stream_matching_with_counts, current_text, current_pattern))
                 naive_mem_usage = 0 # Placeholder, memory_profiler calls removed for speed
 
                 # --- KMP matching (streaming) ---
-                stream_for_kmp = stream_data(current_text) # Create a fresh stream for KMP
-                start_kmp = time.perf_counter()
-                kmp_matches, kmp_comps = kmp_stream_matching_with_counts(stream_for_kmp, current_pattern)
-                kmp_time = time.perf_counter() - start_kmp
+                (kmp_matches, kmp_comps), kmp_time, kmp_cached = result_cache.get_or_time(
+                    "kmp_stream_with_counts", kmp_engine, current_pattern, current_text,
+                    lambda: timed_stream_match(kmp_engine, current_text, current_pattern))
                 kmp_mem_usage = 0 # Placeholder
 
                 # ***** START DEBUGGING MATCH COUNT for specific case *****
                 if pattern_ip == 1 and target_ip == 1 and data_type_label == "Flow":
-                    print(f"NAIVE found {len(naive_matches)} matches. Comparisons: {naive_comps}. Time: {naive_time:.6f}s")
+                    print(f"NAIVE found {len(naive_matches)} matches. Comparisons: {naive_comps}. Time: {describe_time(naive_time)}")
                     # print(f"NAIVE matches at indices: {naive_matches}") # Uncomment to see positions
-                    print(f"KMP found {len(kmp_matches)} matches. Comparisons: {kmp_comps}. Time: {kmp_time:.6f}s")
+                    print(f"KMP found {len(kmp_matches)} matches. Comparisons: {kmp_comps}. Time: {describe_time(kmp_time)}")
                     # print(f"KMP matches at indices: {kmp_matches}") # Uncomment to see positions
                     print(f"--- END DEBUGGING FOR Pattern IP 1 vs Target IP 1 (Flow) ---")
                 # ***** END DEBUGGING MATCH COUNT *****
 
                 # Compute ratios
-                speedup_time = naive_time / kmp_time if kmp_time > 0 else float('inf')
+                if naive_time is None or kmp_time is None:
+                    speedup_time = None  # Left blank for cached rows
+                else:
+                    speedup_time = naive_time / kmp_time if kmp_time > 0 else float('inf')
                 reduction_comps = naive_comps / kmp_comps if kmp_comps > 0 else float('inf')
                 if naive_comps == 0 and kmp_comps == 0: 
                     reduction_comps = 1.0 
@@ -177,12 +321,15 @@ def main():
                     text_length, pattern_length,
                     len(naive_matches), naive_time, naive_comps, naive_mem_usage,
                     len(kmp_matches), kmp_time, kmp_comps, kmp_mem_usage,
-                    speedup_time, reduction_comps
+                    speedup_time, reduction_comps,
+                    describe_match_dates(date_index, kmp_matches, pattern_length, 0),
+                    describe_match_dates(date_index, kmp_matches, pattern_length, -1),
+                    naive_cached, kmp_cached
                 ])
         return output_rows_list
 
     # --- Run tests for Flow data ---
-    flow_output_rows = run_matching_tests(flow_patterns_data, ip_flow_sequences, "Flow")
+    flow_output_rows = run_matching_tests(flow_patterns_data, ip_flow_sequences, "Flow", ip_flow_date_index)
     flow_csv_filename = "flow_pattern_matching_streaming_results.csv"
     with open(flow_csv_filename, "w", newline="") as f:
         writer = csv.writer(f)
@@ -191,13 +338,15 @@ def main():
     print(f"✅ Flow pattern matching (streaming) results saved to {flow_csv_filename}")
 
     # --- Run tests for ASN data ---
-    asn_output_rows = run_matching_tests(asn_patterns_data, ip_asn_sequences_str, "ASN")
+    asn_output_rows = run_matching_tests(asn_patterns_data, ip_asn_sequences_str, "ASN", ip_asn_date_index)
     asn_csv_filename = "asn_pattern_matching_streaming_results.csv"
     with open(asn_csv_filename, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(header)
         writer.writerows(asn_output_rows)
     print(f"✅ ASN pattern matching (streaming) results saved to {asn_csv_filename}")
+    print(f"Result cache: {result_cache.summary()}")
+    print(f"Pattern registry: {pattern_registry.summary()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,12 +3,18 @@ from collections import defaultdict
 import time
 import csv
 import os
+from functools import partial
 
 from functions import (
     stream_data,
     naive_stream_matching_with_counts,
     kmp_stream_matching_with_counts
 )
+from packed_sequence import PackedSequence, PACKED_EXTENSION, read_packed_file
+from sequence_container import SequenceContainer, CONTAINER_EXTENSION
+from compressed_input import COMPRESSED_EXTENSIONS, open_input
+from result_cache import MatchResultCache
+from pattern_registry import PatternRegistry
 
 # Define these at a scope accessible by the __main__ block if used there for checks
 generated_file_prefix = "flow_sequences_" # Used in main and potentially in __main__ check
@@ -23,19 +29,69 @@ compromise_info = {
     3: "2006-09-26",
     6: "2006-09-26"
 }
-def main():
+
+predefined_patterns = {
+    "1": "xxxxxxx", # Pattern for IP 1
+    "5": "mmmmmmm", # Pattern for IP 5
+    "4": "hxxhhxx", # Pattern for IP 4
+    "3": "mmmmmmm", # Pattern for IP 3
+    "6": "mmmmmmh"  # Pattern for IP 6
+}
+# Add other IPs from your flow_sequences.txt if they also have patterns to test,
+# or if you want to test these patterns against all IPs.
+# For this example, we'll only test IPs that have a predefined pattern.
+
+def load_sequence_file(data_file_path):
+    """
+    Parse an 'ip: sequence' text file (plain or gzip/bz2/xz) into {ip: sequence}.
+    """
+    ip_flow_sequences_from_file = {}
+    with open_input(data_file_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ip_str, seq_str = line.split(':', 1)
+                ip_flow_sequences_from_file[ip_str.strip()] = seq_str.strip()
+            except ValueError:
+                print(f"    Warning: Skipping malformed line in '{data_file_path}': {line}")
+                continue
+    return ip_flow_sequences_from_file
+
+def timed_stream_match(engine, text, pattern, label, target_ip_str):
+    """
+    Run a counting engine over stream_data(text).
+
+    Returns:
+        tuple: (matches, comparisons, time_sec); comparisons is -1 if the engine raised.
+    """
+    # IMPORTANT: For performance, ensure print statements inside stream_data and matching functions in functions.py are minimized or disabled.
+    stream = stream_data(text)
+    start = time.perf_counter()
+    try:
+        matches, comparisons = engine(stream, pattern)
+    except Exception as e:
+        print(f"      Error during {label} matching for IP {target_ip_str}: {e}")
+        matches, comparisons = [], -1 # Indicate error
+    return matches, comparisons, time.perf_counter() - start
+
+def main(result_cache_dir=None):
+    """
+    Args:
+        result_cache_dir (str): Directory for the result cache's disk tier
+            (e.g. result_cache.DEFAULT_RESULT_CACHE_DIR). Off by default, so
+            every run scans and times its own rows.
+    """
     print("Starting custom pattern matching tests with augmented flow files...")
 
-    predefined_patterns = {
-        "1": "xxxxxxx", # Pattern for IP 1
-        "5": "mmmmmmm", # Pattern for IP 5
-        "4": "hxxhhxx", # Pattern for IP 4
-        "3": "mmmmmmm", # Pattern for IP 3
-        "6": "mmmmmmh"  # Pattern for IP 6
-    }
-    # Add other IPs from your flow_sequences.txt if they also have patterns to test, 
-    # or if you want to test these patterns against all IPs.
-    # For this example, we'll only test IPs that have a predefined pattern.
+    # Identical (engine, pattern, text) scans are answered from the cache.
+    # Only matches and comparisons are cached: cached rows are marked in the
+    # CSV and have no timing, since nothing ran for them.
+    result_cache = MatchResultCache(disk_dir=result_cache_dir)
+    # The same few patterns recur in every file; compile each one once
+    pattern_registry = PatternRegistry()
+    kmp_engine = partial(kmp_stream_matching_with_counts, registry=pattern_registry)
 
     all_results = []
     header = [
@@ -43,30 +99,39 @@ def main():
         "text_length_chars", "pattern_length_chars",
         "naive_match_count", "naive_time_sec", "naive_comparisons",
         "kmp_match_count", "kmp_time_sec", "kmp_comparisons",
-        "kmp_speedup_ratio_time", "kmp_reduction_ratio_comps"
+        "kmp_speedup_ratio_time", "kmp_reduction_ratio_comps",
+        "naive_cached", "kmp_cached"
     ]
 
     for size_mb in target_sizes_mb:
+        # Prefer the 2-bit packed copy (a quarter of the I/O and resident
+        # memory), then the binary container (only pattern IPs are read),
+        # then the text file, plain or compressed
+        packed_file_path = f"{generated_file_prefix}{size_mb}mb{PACKED_EXTENSION}"
+        container_file_path = f"{generated_file_prefix}{size_mb}mb{CONTAINER_EXTENSION}"
         data_file_path = f"{generated_file_prefix}{size_mb}mb.txt"
+        compressed_file_paths = [data_file_path + extension for extension in COMPRESSED_EXTENSIONS]
+        for candidate_path in [packed_file_path, container_file_path, data_file_path] + compressed_file_paths:
+            if os.path.exists(candidate_path):
+                data_file_path = candidate_path
+                break
         print(f"\n===== PROCESSING FILE: {data_file_path} =====")
 
         if not os.path.exists(data_file_path):
             print(f"  File '{data_file_path}' not found. Skipping.")
             continue
 
-        ip_flow_sequences_from_file = {}
         try:
-            with open(data_file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        ip_str, seq_str = line.split(':', 1)
-                        ip_flow_sequences_from_file[ip_str.strip()] = seq_str.strip()
-                    except ValueError:
-                        print(f"    Warning: Skipping malformed line in '{data_file_path}': {line}")
-                        continue
+            if data_file_path == packed_file_path:
+                # Already compact and cheap to parse, so not worth caching
+                ip_flow_sequences_from_file = read_packed_file(data_file_path)
+            elif data_file_path == container_file_path:
+                with SequenceContainer(data_file_path) as container:
+                    ip_flow_sequences_from_file = {
+                        ip: container.read(ip) for ip in container.ips() if ip in predefined_patterns
+                    }
+            else:
+                ip_flow_sequences_from_file = load_sequence_file(data_file_path)
         except Exception as e:
             print(f"  Error reading file {data_file_path}: {e}. Skipping.")
             continue
@@ -80,6 +145,9 @@ def main():
                 # print(f"  IP {target_ip_str} has no predefined pattern. Skipping.")
                 continue # Skip IPs for which we don't have a specific pattern
             
+            if isinstance(current_text, PackedSequence):
+                # Only the IPs being tested are unpacked
+                current_text = current_text.to_str()
             current_pattern = predefined_patterns[target_ip_str]
             print(f"  --- Testing IP: {target_ip_str} with pattern '{current_pattern}' (Text length: {len(current_text)}) ---")
             
@@ -94,28 +162,24 @@ def main():
             pattern_length_chars = len(current_pattern)
 
             # --- Naive matching (streaming) ---
-            # IMPORTANT: For performance, ensure print statements inside stream_data and matching functions in functions.py are minimized or disabled.
-            stream_for_naive = stream_data(current_text) 
-            start_naive = time.perf_counter()
-            try:
-                naive_matches, naive_comps = naive_stream_matching_with_counts(stream_for_naive, current_pattern)
-            except Exception as e:
-                print(f"      Error during Naive matching for IP {target_ip_str}: {e}")
-                naive_matches, naive_comps = [], -1 # Indicate error
-            naive_time = time.perf_counter() - start_naive
+            (naive_matches, naive_comps), naive_time, naive_cached = result_cache.get_or_time(
+                "naive_stream_with_counts", naive_stream_matching_with_counts, current_pattern, current_text,
+                lambda: timed_stream_match(naive_stream_matching_with_counts, current_text, current_pattern,
+                                           "Naive", target_ip_str),
+                cacheable=lambda result: result[1] >= 0)
 
             # --- KMP matching (streaming) ---
-            stream_for_kmp = stream_data(current_text) # Fresh stream for KMP
-            start_kmp = time.perf_counter()
-            try:
-                kmp_matches, kmp_comps = kmp_stream_matching_with_counts(stream_for_kmp, current_pattern)
-            except Exception as e:
-                print(f"      Error during KMP matching for IP {target_ip_str}: {e}")
-                kmp_matches, kmp_comps = [], -1 # Indicate error
-            kmp_time = time.perf_counter() - start_kmp
+            (kmp_matches, kmp_comps), kmp_time, kmp_cached = result_cache.get_or_time(
+                "kmp_stream_with_counts", kmp_engine, current_pattern, current_text,
+                lambda: timed_stream_match(kmp_engine, current_text, current_pattern,
+                                           "KMP", target_ip_str),
+                cacheable=lambda result: result[1] >= 0)
 
             # Compute ratios
-            speedup_time = (naive_time / kmp_time) if kmp_time > 0 else float('inf')
+            if naive_time is None or kmp_time is None:
+                speedup_time = None  # Left blank for cached rows
+            else:
+                speedup_time = (naive_time / kmp_time) if kmp_time > 0 else float('inf')
             reduction_comps = (naive_comps / kmp_comps) if kmp_comps > 0 and naive_comps >=0 and kmp_comps >=0 else float('inf')
             if naive_comps == 0 and kmp_comps == 0:
                 reduction_comps = 1.0 
@@ -128,10 +192,16 @@ def main():
                 text_length_chars, pattern_length_chars,
                 len(naive_matches), naive_time, naive_comps,
                 len(kmp_matches), kmp_time, kmp_comps,
-                speedup_time, reduction_comps
+                speedup_time, reduction_comps,
+                naive_cached, kmp_cached
             ])
-            print(f"      Naive: {len(naive_matches):3d} matches, {naive_comps:10d} comps, {naive_time:8.4f}s")
-            print(f"      KMP:   {len(kmp_matches):3d} matches, {kmp_comps:10d} comps, {kmp_time:8.4f}s")
+            print(f"      Naive: {len(naive_matches):3d} matches, {naive_comps:10d} comps, "
+                  f"{'  (cached)' if naive_cached else f'{naive_time:8.4f}s'}")
+            print(f"      KMP:   {len(kmp_matches):3d} matches, {kmp_comps:10d} comps, "
+                  f"{'  (cached)' if kmp_cached else f'{kmp_time:8.4f}s'}")
+
+    print(f"\n  Result cache: {result_cache.summary()}")
+    print(f"  Pattern registry: {pattern_registry.summary()}")
 
     # Save all results to a new CSV file
     output_csv_filename = "main2_custom_pattern_results.csv"
@@ -0,0 +1,111 @@
+## Word-parallel matching on 2-bit packed sequences
+# A packed block read as one little-endian integer holds symbol i at bits
+# 2i .. 2i + 1 (see packed_sequence.py). For each alphabet symbol c, an
+# equality mask has bit 2i set iff symbol i == c, computed for the whole block
+# with one XOR, shift, OR and AND. A match starts at i iff eq[pattern[k]] has
+# bit 2(i + k) set for every k, so shifting each pattern position's mask down
+# by 2k and AND-ing them leaves exactly the match starts. Each big-int
+# operation works on 64 bits (32 symbols) per machine word and nothing is
+# unpacked to characters.
+
+from packed_sequence import PackedSequence, PACK_BLOCK_SYMBOLS
+
+def _symbol_masks(block_symbols):
+    """
+    LOW has bit 2i set for every symbol slot; replicated[c] holds code c in every slot.
+    """
+    low = int.from_bytes(b'\x55' * ((block_symbols + 3) // 4), 'little')
+    return low, [low * code for code in range(4)]
+
+def packed_stream_matching(packed, pattern, max_matches=None, block_symbols=PACK_BLOCK_SYMBOLS):
+    """
+    Find every occurrence of pattern in a PackedSequence without unpacking it.
+
+    Args:
+        packed (PackedSequence or str): Text to search (str is packed first).
+        pattern (str): Pattern over the same alphabet.
+        max_matches (int): Stop after this many matches.
+        block_symbols (int): Symbols scanned per big-int block (multiple of 4).
+            Consecutive blocks overlap by len(pattern) - 1 symbols.
+
+    Returns:
+        list: Start positions, identical to kmp_stream_matching's.
+    """
+    if not isinstance(packed, PackedSequence):
+        packed = PackedSequence.from_str(packed)
+    m = len(pattern)
+    if m == 0 or m > len(packed) or (max_matches is not None and max_matches < 1):
+        return []
+    if any(symbol not in packed.alphabet for symbol in pattern):
+        return []
+    if block_symbols % 4:
+        raise ValueError("block_symbols must be a multiple of 4")
+    codes = [packed.alphabet.index(symbol) for symbol in pattern]
+    last_start = len(packed) - m  # Last valid match start
+
+    matches = []
+    for start in range(0, last_start + 1, block_symbols):
+        starts_in_block = min(block_symbols, last_start - start + 1)
+        span = starts_in_block + m - 1
+        text = int.from_bytes(packed.data[start // 4 : (start + span + 3) // 4], 'little')
+        low, replicated = _symbol_masks(span)
+
+        eq = {}
+        for code in set(codes):
+            x = text ^ replicated[code]
+            eq[code] = low & ~(x | (x >> 1))
+        # Only starts belonging to this block; this also drops the padding
+        # symbols after the end of the sequence
+        found = (1 << (2 * starts_in_block)) - 1
+        for k, code in enumerate(codes):
+            found &= eq[code] >> (2 * k)
+            if not found:
+                break
+        if not found:
+            continue
+
+        bits = bin(found)[:1:-1]  # Bit 0 first
+        offset = bits.find('1')
+        while offset != -1:
+            matches.append(start + offset // 2)
+            if max_matches is not None and len(matches) >= max_matches:
+                return matches
+            offset = bits.find('1', offset + 2)
+    return matches
+
+if __name__ == "__main__":
+    import os
+    import random
+    import time
+
+    from functions import stream_chunks, kmp_chunk_stream_matching
+    from main2 import predefined_patterns, load_sequence_file
+    from packed_sequence import read_packed_file
+    from generate_augmented_flows import augment_sequence
+
+    data_file_path = "flow_sequences_10mb.2bit"
+    if os.path.exists(data_file_path):
+        sequences = read_packed_file(data_file_path)
+    else:
+        # Build a ~1M-symbol text per IP from the original sequences
+        print(f"'{data_file_path}' not found; augmenting flow_sequences.txt instead.")
+        random.seed(0)
+        sequences = {ip: PackedSequence.from_str(augment_sequence(seq, 1 << 20))
+                     for ip, seq in load_sequence_file("flow_sequences.txt").items()}
+
+    for ip, pattern in predefined_patterns.items():
+        if ip not in sequences:
+            continue
+        packed = sequences[ip]
+        start = time.perf_counter()
+        packed_matches = packed_stream_matching(packed, pattern)
+        packed_time = time.perf_counter() - start
+
+        text = packed.to_str()
+        start = time.perf_counter()
+        kmp_matches = kmp_chunk_stream_matching(stream_chunks(text, 1 << 16), pattern)
+        kmp_time = time.perf_counter() - start
+        status = "OK" if packed_matches == kmp_matches else "MISMATCH"
+        print(f"IP {ip:>2s} '{pattern}' over {len(packed)} symbols: {len(packed_matches)} matches, "
+              f"packed {packed_time:.4f}s vs KMP {kmp_time:.4f}s "
+              f"({kmp_time / packed_time:.1f}x) [{status}]")
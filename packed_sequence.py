@@ -0,0 +1,223 @@
+## 2-bit packed storage for flow-level sequences
+# Flow-level sequences use a 4-symbol alphabet (a/b/c/d from flow_bucket,
+# h/x/m/l in the augmented files), so each symbol fits in 2 bits: four symbols
+# per byte instead of one character each.
+#
+# Layout: symbol i lives in bits 2*(i % 4) .. 2*(i % 4) + 1 of byte i // 4
+# (least significant first). Read as one little-endian integer, symbol i is
+# therefore at bits 2i .. 2i + 1, which is what the word-parallel matcher uses.
+
+import os
+import struct
+
+FLOW_ALPHABET = "abcd"       # flow_bucket() in main.py
+AUGMENTED_ALPHABET = "hxml"  # flow_sequences.txt and the augmented files
+KNOWN_ALPHABETS = (FLOW_ALPHABET, AUGMENTED_ALPHABET)
+
+PACKED_EXTENSION = ".2bit"
+PACKED_MAGIC = b"PK2S"
+PACKED_VERSION = 1
+PACKED_HEADER_SIZE = len(PACKED_MAGIC) + 1  # Magic and version byte before the first record
+
+# Symbols are packed in blocks so no intermediate string or integer grows
+# beyond this many symbols (must be a multiple of 4)
+PACK_BLOCK_SYMBOLS = 1 << 20
+
+def infer_alphabet(text):
+    """
+    Pick the known alphabet covering text, or its sorted symbols if there are at most 4.
+    """
+    symbols = set(text)
+    for alphabet in KNOWN_ALPHABETS:
+        if symbols <= set(alphabet):
+            return alphabet
+    if len(symbols) > 4:
+        raise ValueError(f"Text uses {len(symbols)} symbols; 2-bit packing supports at most 4")
+    alphabet = ''.join(sorted(symbols))
+    # Pad with symbols that cannot occur in the text
+    filler = (chr(c) for c in range(0x2400, 0x2500) if chr(c) not in symbols)
+    while len(alphabet) < 4:
+        alphabet += next(filler)
+    return alphabet
+
+class PackedSequence:
+    """
+    A sequence over a 4-symbol alphabet stored 4 symbols per byte.
+
+    Supports len(), indexing and slicing (slices decode to str), iteration in
+    str chunks for the streaming matchers, and conversion back to str.
+    """
+    def __init__(self, alphabet, data=None, length=0):
+        if len(alphabet) != 4 or len(set(alphabet)) != 4:
+            raise ValueError("alphabet must have exactly 4 distinct symbols")
+        self.alphabet = alphabet
+        self.data = data if data is not None else bytearray()
+        self.length = length
+        self._decode_table = [
+            alphabet[b & 3] + alphabet[(b >> 2) & 3] + alphabet[(b >> 4) & 3] + alphabet[b >> 6]
+            for b in range(256)
+        ]
+
+    @classmethod
+    def from_str(cls, text, alphabet=None):
+        alphabet = alphabet or infer_alphabet(text)
+        packed = cls(alphabet)
+        packed.extend(text)
+        return packed
+
+    def extend(self, text):
+        """
+        Append symbols. Only valid when the current length is a multiple of 4,
+        i.e. while writing a sequence block by block. Symbols outside the
+        alphabet (digits included) raise ValueError before anything is appended:
+
+        >>> PackedSequence("hxml").extend("h2x3")
+        Traceback (most recent call last):
+        ...
+        ValueError: Text contains symbols outside alphabet 'hxml'
+        """
+        if self.length % 4:
+            raise ValueError("Can only extend a PackedSequence whose length is a multiple of 4")
+        if not set(text) <= set(self.alphabet):
+            raise ValueError(f"Text contains symbols outside alphabet '{self.alphabet}'")
+        to_digit = str.maketrans(self.alphabet, "0123")
+        for start in range(0, len(text), PACK_BLOCK_SYMBOLS):
+            block = text[start : start + PACK_BLOCK_SYMBOLS]
+            digits = block.translate(to_digit)
+            # Reversed base-4 digits put the first symbol in the lowest bits
+            nbytes = (len(block) + 3) // 4
+            self.data += int(digits[::-1], 4).to_bytes(nbytes, 'little') if block else b""
+        self.length += len(text)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    def _decode(self, start, stop):
+        first_byte, last_byte = start // 4, (stop + 3) // 4
+        table = self._decode_table
+        text = ''.join([table[b] for b in self.data[first_byte:last_byte]])
+        return text[start - first_byte * 4 : stop - first_byte * 4]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return self._decode(0, self.length)[key]
+            return self._decode(start, max(start, stop))
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("PackedSequence index out of range")
+        return self.alphabet[(self.data[key // 4] >> (2 * (key % 4))) & 3]
+
+    def iter_chunks(self, chunk_size=PACK_BLOCK_SYMBOLS):
+        """
+        Yield the sequence as str chunks of chunk_size symbols.
+        """
+        for start in range(0, self.length, chunk_size):
+            yield self._decode(start, min(self.length, start + chunk_size))
+
+    def to_str(self):
+        return ''.join(self.iter_chunks())
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            return (self.alphabet, self.length, self.data) == (other.alphabet, other.length, other.data)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PackedSequence(alphabet='{self.alphabet}', length={self.length}, nbytes={self.nbytes})"
+
+class PackedFileWriter:
+    """
+    Write sequences one at a time to a packed multi-IP file.
+
+    Each record is: ip length (u16), ip (utf-8), alphabet (4 utf-8 symbols,
+    length-prefixed), symbol count (u64), then the packed payload.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(PACKED_MAGIC + bytes([PACKED_VERSION]))
+
+    def _write_record_header(self, ip, alphabet, length):
+        ip_bytes = str(ip).encode('utf-8')
+        alphabet_bytes = alphabet.encode('utf-8')
+        self.file.write(struct.pack('<H', len(ip_bytes)) + ip_bytes)
+        self.file.write(struct.pack('<B', len(alphabet_bytes)) + alphabet_bytes)
+        self.file.write(struct.pack('<Q', length))
+
+    def add(self, ip, sequence):
+        if not isinstance(sequence, PackedSequence):
+            sequence = PackedSequence.from_str(sequence)
+        self._write_record_header(ip, sequence.alphabet, sequence.length)
+        self.file.write(sequence.data)
+
+    def add_blocks(self, ip, blocks, length, alphabet):
+        """
+        Write a sequence of known length from str blocks without holding it in
+        memory. Every block except the last must be a multiple of 4 symbols.
+        """
+        self._write_record_header(ip, alphabet, length)
+        written = 0
+        for block in blocks:
+            if written % 4:
+                raise ValueError("Only the last block may have a length that is not a multiple of 4")
+            packed = PackedSequence(alphabet)
+            packed.extend(block)
+            self.file.write(packed.data)
+            written += len(block)
+        if written != length:
+            raise ValueError(f"Expected {length} symbols for IP {ip}, got {written}")
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        """
+        Close and delete the partial file.
+        """
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_packed_file(path, sequences):
+    """
+    Write {ip: str or PackedSequence} to a packed multi-IP file.
+    """
+    with PackedFileWriter(path) as writer:
+        for ip, sequence in sequences.items():
+            writer.add(ip, sequence)
+
+def read_packed_file(path):
+    """
+    Read a packed multi-IP file into {ip: PackedSequence}.
+    """
+    sequences = {}
+    with open(path, 'rb') as f:
+        header = f.read(len(PACKED_MAGIC) + 1)
+        if header[:len(PACKED_MAGIC)] != PACKED_MAGIC or header[-1] != PACKED_VERSION:
+            raise ValueError(f"'{path}' is not a version {PACKED_VERSION} packed sequence file")
+        while True:
+            size = f.read(2)
+            if not size:
+                break
+            ip = f.read(struct.unpack('<H', size)[0]).decode('utf-8')
+            alphabet = f.read(struct.unpack('<B', f.read(1))[0]).decode('utf-8')
+            length = struct.unpack('<Q', f.read(8))[0]
+            data = bytearray(f.read((length + 3) // 4))
+            sequences[ip] = PackedSequence(alphabet, data, length)
+    return sequences
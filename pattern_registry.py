@@ -0,0 +1,157 @@
+## Registry of compiled pattern artifacts
+# Engines recompile the same few patterns for every target and every file
+# (an LPS table per kmp_stream_matching_with_counts call, for instance). The
+# registry memoizes each compiled artifact by (engine, pattern) in a bounded
+# LRU, counts hits, misses and compile time, and can be saved to disk so a
+# later sweep starts warm. Saved artifacts carry a fingerprint of their
+# compiler and are dropped on load when the compiler has changed.
+
+import os
+import pickle
+import time
+from array import array
+from collections import OrderedDict
+
+from functions import compute_lps, compute_lps_with_counts, build_aho_corasick
+from result_cache import engine_fingerprint
+
+DEFAULT_MAX_ENTRIES = 1024
+
+def pattern_key(pattern):
+    """
+    Hashable registry key for a pattern. str, bytes and tuples of hashable
+    patterns key as themselves; array patterns (e.g. the ASN token patterns)
+    key by typecode and raw bytes, other buffers by their bytes, and lists
+    and tuples element by element.
+    """
+    if isinstance(pattern, (str, bytes)):
+        return pattern
+    if isinstance(pattern, array):
+        return ("array", pattern.typecode, pattern.tobytes())
+    if isinstance(pattern, (bytearray, memoryview)):
+        return bytes(pattern)
+    if isinstance(pattern, (tuple, list)):
+        return tuple(pattern_key(item) for item in pattern)
+    return pattern
+
+# Engine name -> compiler(pattern) -> artifact
+PATTERN_COMPILERS = {
+    "kmp_lps": compute_lps,
+    "kmp_lps_with_counts": compute_lps_with_counts,
+    # Keyed by a tuple of patterns
+    "aho_corasick": build_aho_corasick
+}
+
+class PatternRegistry:
+    """
+    LRU memo of compiled pattern artifacts keyed by (engine, pattern_key(pattern)).
+
+    Compilers come from PATTERN_COMPILERS plus any added with
+    register_compiler(). Artifacts must not be modified by callers, since the
+    same object is handed out on every hit.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, compilers=None):
+        self.max_entries = max_entries
+        self.compilers = dict(PATTERN_COMPILERS)
+        self.compilers.update(compilers or {})
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compile_time = {}  # engine -> total seconds spent compiling
+        self.fingerprints = {}  # engine -> engine_fingerprint(compiler), computed on save/load
+
+    def register_compiler(self, engine, compiler):
+        self.compilers[engine] = compiler
+        self.fingerprints.pop(engine, None)
+
+    def fingerprint(self, engine):
+        """
+        Fingerprint of engine's compiler (see result_cache.engine_fingerprint),
+        or None if no compiler is registered for engine.
+        """
+        if engine not in self.compilers:
+            return None
+        if engine not in self.fingerprints:
+            self.fingerprints[engine] = engine_fingerprint(self.compilers[engine])
+        return self.fingerprints[engine]
+
+    def get(self, pattern, engine):
+        """
+        Compiled artifact for pattern, compiling it on a miss.
+        """
+        key = (engine, pattern_key(pattern))
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if engine not in self.compilers:
+            raise ValueError(f"No compiler registered for engine '{engine}'")
+        self.misses += 1
+        start = time.perf_counter()
+        artifact = self.compilers[engine](pattern)
+        self.compile_time[engine] = self.compile_time.get(engine, 0.0) + time.perf_counter() - start
+        self.entries[key] = artifact
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return artifact
+
+    def save(self, path):
+        """
+        Write the cached artifacts (not the compilers or counters) to path,
+        each with the fingerprint of the compiler that built it.
+        """
+        items = [(key, self.fingerprint(key[0]), artifact) for key, artifact in self.entries.items()]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """
+        Add artifacts saved by save(). Artifacts whose compiler is missing or
+        no longer matches its saved fingerprint (or from files written without
+        fingerprints) are skipped and recompiled on demand.
+
+        Returns:
+            int: Number of entries loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as f:
+            items = pickle.load(f)
+        loaded = 0
+        for item in items:
+            if len(item) != 3:
+                continue
+            key, fingerprint, artifact = item
+            if fingerprint is None or fingerprint != self.fingerprint(key[0]):
+                continue
+            self.entries[key] = artifact
+            loaded += 1
+        skipped = len(items) - loaded
+        if skipped:
+            print(f"  Skipped {skipped} stale compiled patterns in '{path}'")
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return loaded
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "compile_time_sec": sum(self.compile_time.values()),
+            # Compile time spread over every lookup it served
+            "amortized_compile_sec": sum(self.compile_time.values()) / lookups if lookups else 0.0
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['hits']} hits, {stats['misses']} compiles, {stats['evictions']} evictions "
+                f"({stats['hit_rate']:.1%} hit rate); {stats['compile_time_sec'] * 1e3:.3f}ms compiling, "
+                f"{stats['amortized_compile_sec'] * 1e6:.2f}us per lookup")
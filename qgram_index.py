@@ -0,0 +1,298 @@
+## q-gram inverted index for candidate filtering
+# Ad-hoc queries over many IPs mostly hit sequences that cannot contain the
+# pattern at all. The index maps every q-gram to the sorted global positions
+# where it occurs (one position space over all IPs of an encoding), stored as
+# varbyte-compressed deltas in one NumPy byte buffer. A query intersects the
+# postings of the pattern's q-grams (each shifted back by its offset in the
+# pattern), and only the surviving candidate spans are verified with KMP.
+
+import csv
+import time
+
+import numpy as np
+
+from functions import kmp_chunk_stream_matching
+
+DEFAULT_Q = 3
+# Only the rarest q-grams of a long pattern are intersected; the candidates
+# stay a superset of the matches and KMP verification removes the rest
+MAX_FILTER_QGRAMS = 4
+# q-grams are packed exactly into uint64 keys, one byte per symbol
+MAX_Q = 8
+
+def qgram_keys(codes, q):
+    """
+    uint64 key of every q-gram of a uint8 code array (keys[i] packs codes[i : i + q]).
+    """
+    if len(codes) < q:
+        return np.zeros(0, dtype=np.uint64)
+    keys = np.zeros(len(codes) - q + 1, dtype=np.uint64)
+    for offset in range(q):
+        keys = (keys << np.uint64(8)) | codes[offset : len(codes) - q + 1 + offset].astype(np.uint64)
+    return keys
+
+def varbyte_encode(values):
+    """
+    LEB128-style varbyte encoding of a uint64 array: 7 bits per byte, high bit
+    set on every byte except the last of each value.
+
+    Returns:
+        np.ndarray: uint8 buffer.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= (np.uint64(1) << np.uint64(shift))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    out = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for j in range(int(lengths.max()) if len(values) else 0):
+        mask = lengths > j
+        byte = (values[mask] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        more = (lengths[mask] - 1 > j).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + j] = (byte | more).astype(np.uint8)
+    return out
+
+def varbyte_decode(buffer):
+    """
+    Inverse of varbyte_encode().
+    """
+    buffer = np.asarray(buffer, dtype=np.uint8)
+    if not len(buffer):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(buffer < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    within = np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1)
+    parts = (buffer & 0x7F).astype(np.uint64) << (7 * within).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+class QGramIndex:
+    """
+    Inverted index from q-grams to positions over a dict of sequences.
+
+    Directory arrays: keys (sorted uint64 q-gram keys), counts and
+    byte_starts (offsets into postings, one past the end for the last key).
+    Positions are global: sequence i occupies [doc_starts[i], doc_starts[i + 1]).
+    """
+    def __init__(self, sequences, q=DEFAULT_Q):
+        """
+        Args:
+            sequences (dict): key -> ASCII str or bytes.
+            q (int): q-gram length, 1..MAX_Q.
+        """
+        if not 1 <= q <= MAX_Q:
+            raise ValueError(f"q must be between 1 and {MAX_Q}, got {q}")
+        self.q = q
+        self.sequences = sequences
+        self.doc_keys = list(sequences)
+        lengths = [len(sequences[key]) for key in self.doc_keys]
+        self.doc_starts = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+        all_keys = []
+        all_positions = []
+        for start, key in zip(self.doc_starts.tolist(), self.doc_keys):
+            sequence = sequences[key]
+            codes = np.frombuffer(sequence.encode('ascii') if isinstance(sequence, str) else sequence, dtype=np.uint8)
+            keys = qgram_keys(codes, q)
+            all_keys.append(keys)
+            all_positions.append(np.arange(start, start + len(keys), dtype=np.uint64))
+        keys = np.concatenate(all_keys) if all_keys else np.zeros(0, dtype=np.uint64)
+        positions = np.concatenate(all_positions) if all_positions else np.zeros(0, dtype=np.uint64)
+
+        # Stable sort keeps each key's positions ascending
+        order = np.argsort(keys, kind='stable')
+        keys, positions = keys[order], positions[order]
+        new_key = np.ones(len(keys), dtype=bool)
+        new_key[1:] = keys[1:] != keys[:-1]
+        group_starts = np.flatnonzero(new_key)
+
+        # Each posting list stores its first position, then gaps
+        deltas = positions.copy()
+        deltas[1:] -= positions[:-1]
+        deltas[group_starts] = positions[group_starts]
+        encoded_lengths = np.ones(len(deltas), dtype=np.int64)
+        for shift in range(7, 64, 7):
+            encoded_lengths += deltas >= (np.uint64(1) << np.uint64(shift))
+
+        self.keys = keys[group_starts]
+        self.counts = np.diff(np.append(group_starts, len(keys))).astype(np.int64)
+        self.byte_starts = np.concatenate(([0], np.cumsum(encoded_lengths)))[np.append(group_starts, len(keys))]
+        self.postings = varbyte_encode(deltas)
+        self.posting_count = len(keys)
+
+    @property
+    def nbytes(self):
+        return self.postings.nbytes + self.keys.nbytes + self.counts.nbytes + self.byte_starts.nbytes
+
+    def _slot(self, key):
+        slot = int(np.searchsorted(self.keys, np.uint64(key)))
+        if slot < len(self.keys) and self.keys[slot] == key:
+            return slot
+        return None
+
+    def postings_for(self, key):
+        """
+        Sorted global positions of one q-gram key.
+        """
+        slot = self._slot(key)
+        if slot is None:
+            return np.zeros(0, dtype=np.uint64)
+        return np.cumsum(varbyte_decode(self.postings[self.byte_starts[slot] : self.byte_starts[slot + 1]]),
+                         dtype=np.uint64)
+
+    def candidates(self, pattern, max_qgrams=MAX_FILTER_QGRAMS):
+        """
+        Global start positions where the max_qgrams rarest q-grams of pattern
+        occur at the right offsets, or None when pattern is shorter than q
+        (no filtering).
+        """
+        if len(pattern) < self.q:
+            return None
+        codes = np.frombuffer(pattern.encode('ascii') if isinstance(pattern, str) else pattern, dtype=np.uint8)
+        offsets = {}
+        for offset, key in enumerate(qgram_keys(codes, self.q).tolist()):
+            offsets.setdefault(key, offset)
+        slots = []
+        for key, offset in offsets.items():
+            slot = self._slot(key)
+            if slot is None:
+                return np.zeros(0, dtype=np.int64)
+            slots.append((int(self.counts[slot]), key, offset))
+        # Rarest q-grams first keeps the running intersection small
+        slots.sort()
+        result = None
+        for _, key, offset in slots[:max_qgrams]:
+            starts = self.postings_for(key).astype(np.int64) - offset
+            result = starts[starts >= 0] if result is None else np.intersect1d(result, starts, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def query(self, pattern, registry=None):
+        """
+        Exact matches of pattern in every indexed sequence.
+
+        Returns:
+            tuple: ({sequence key: [positions]}, candidate count). With no
+            filtering possible, every sequence is scanned and the count is None.
+        """
+        results = {}
+        if not pattern:
+            return results, 0
+        candidates = self.candidates(pattern)
+        if candidates is None:
+            for key in self.doc_keys:
+                matches = kmp_chunk_stream_matching([self.sequences[key]], pattern, registry=registry)
+                if matches:
+                    results[key] = matches
+            return results, None
+
+        m = len(pattern)
+        docs = np.searchsorted(self.doc_starts, candidates, side='right') - 1
+        for doc in np.unique(docs).tolist():
+            text = self.sequences[self.doc_keys[doc]]
+            local = (candidates[docs == doc] - self.doc_starts[doc]).tolist()
+            # Verify with KMP over merged candidate spans; the index is
+            # complete, so every true match lies in some span
+            matches = []
+            span_start = span_end = None
+            for position in local + [None]:
+                if position is not None and span_end is not None and position <= span_end:
+                    span_end = position + m
+                    continue
+                if span_start is not None:
+                    found = kmp_chunk_stream_matching([text[span_start:span_end]], pattern, registry=registry)
+                    matches.extend(span_start + match for match in found)
+                if position is not None:
+                    span_start, span_end = position, position + m
+            if matches:
+                results[self.doc_keys[doc]] = matches
+        return results, len(candidates)
+
+def build_qgram_indexes(encoded, q=DEFAULT_Q):
+    """
+    Index the flow and ASN string sequences of load_encoded_sequences().
+
+    Returns:
+        dict: "flow" / "asn" -> QGramIndex
+    """
+    return {
+        "flow": QGramIndex(encoded["ip_flow_sequences"], q),
+        "asn": QGramIndex(encoded["ip_asn_sequences_str"], q)
+    }
+
+BENCHMARK_HEADER = [
+    "encoding", "query", "pattern_length", "candidates", "matching_ips", "match_count",
+    "index_time_sec", "scan_time_sec", "speedup"
+]
+
+def full_scan(sequences, pattern):
+    """
+    Reference: KMP over every sequence, as run_matching_tests does per pattern.
+    """
+    results = {}
+    for key, text in sequences.items():
+        if text:
+            matches = kmp_chunk_stream_matching([text], pattern)
+            if matches:
+                results[key] = matches
+    return results
+
+def main(file_path="cs448b_ipasn.csv", q=DEFAULT_Q, random_queries=20, seed=448):
+    from main import load_encoded_sequences
+
+    encoded = load_encoded_sequences(file_path)
+    start = time.perf_counter()
+    indexes = build_qgram_indexes(encoded, q)
+    print(f"Built q={q} indexes in {time.perf_counter() - start:.3f}s")
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for encoding, patterns in (("flow", encoded["flow_patterns_data"]), ("asn", encoded["asn_patterns_data"])):
+        index = indexes[encoding]
+        sequences = index.sequences
+        print(f"  {encoding}: {index.posting_count} postings in {index.postings.nbytes} bytes "
+              f"({index.postings.nbytes / max(1, index.posting_count):.2f} bytes/posting, "
+              f"{len(index.keys)} distinct q-grams, {index.nbytes} bytes total)")
+
+        # Compromise patterns, substrings of random IPs and random strings
+        # over the encoding's symbols (which mostly occur nowhere)
+        queries = {f"compromise_ip_{ip}": pattern for ip, pattern in patterns.items() if pattern}
+        texts = [text for text in sequences.values() if len(text) > 32]
+        symbols = sorted(set(''.join(texts)))
+        for k in range(random_queries):
+            length = int(rng.integers(q, 33))
+            text = texts[int(rng.integers(len(texts)))]
+            if k % 2:
+                queries[f"random_{k}"] = ''.join(rng.choice(symbols, size=length))
+            else:
+                offset = int(rng.integers(len(text) - length))
+                queries[f"substring_{k}"] = text[offset : offset + length]
+
+        for name, pattern in queries.items():
+            start = time.perf_counter()
+            found, candidate_count = index.query(pattern)
+            index_time = time.perf_counter() - start
+            start = time.perf_counter()
+            expected = full_scan(sequences, pattern)
+            scan_time = time.perf_counter() - start
+            if found != expected:
+                print(f"    MISMATCH for {encoding} query {name}")
+            rows.append([encoding, name, len(pattern), candidate_count, len(found),
+                         sum(len(matches) for matches in found.values()), index_time, scan_time,
+                         scan_time / index_time if index_time > 0 else float('inf')])
+
+        encoding_rows = [row for row in rows if row[0] == encoding]
+        total_index = sum(row[6] for row in encoding_rows)
+        total_scan = sum(row[7] for row in encoding_rows)
+        print(f"    {len(encoding_rows)} queries: index {total_index:.4f}s vs full scan {total_scan:.4f}s "
+              f"({total_scan / total_index:.1f}x)")
+
+    output_csv_filename = "qgram_index_benchmark.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(BENCHMARK_HEADER)
+        writer.writerows(rows)
+    print(f"✅ q-gram index benchmark complete. Results saved to {output_csv_filename}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+## Rate-controlled replay source (virtual clock)
+# Models arrival rates, bursts and jitter for a streamed text without sleeping.
+# Arrival times live on a VirtualClock, while matcher cost is measured as CPU
+# time, so a realistic-rate simulation finishes as fast as the matcher can run.
+
+import random
+import time
+
+from functions import compute_lps, kmp_feed, naive_feed
+from detection_latency import latency_percentiles
+
+class VirtualClock:
+    """
+    Simulated clock. sleep() advances the time instead of blocking, so it can
+    be passed anywhere a `time`-like object with time()/sleep() is expected.
+    """
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+def rate_controlled_source(data, rate_cps, chunk_size=1, burst=None, jitter=0.0,
+                           pause_probability=0.0, pause_sec=0.0, seed=None,
+                           clock=None, arrivals=None):
+    """
+    Replay data in chunks at a simulated arrival rate.
+
+    Arrivals are shaped by a token bucket: tokens refill at rate_cps
+    characters per second up to `burst` characters, and a chunk is released
+    once the bucket holds enough tokens for it. With pause_probability > 0 the
+    source goes quiet for pause_sec after a chunk, letting the bucket refill so
+    the next chunks arrive as a burst. Each release is delayed by Gaussian
+    jitter (standard deviation `jitter` seconds), without reordering chunks.
+
+    Args:
+        data (str): Text to replay.
+        rate_cps (float): Sustained arrival rate in characters per second.
+        chunk_size (int): Characters per released chunk.
+        burst (int): Token bucket capacity in characters (default chunk_size).
+        jitter (float): Standard deviation of per-chunk delay in seconds.
+        pause_probability (float): Chance of an idle gap after each chunk.
+        pause_sec (float): Length of an idle gap in seconds.
+        seed (int): Seed for the jitter/pause RNG.
+        clock (VirtualClock): Clock advanced to each arrival (default: new clock).
+        arrivals (list): If given, collects (end_offset, virtual_time) per chunk.
+
+    Yields:
+        str: The next chunk; clock.time() is its arrival time.
+    """
+    if rate_cps <= 0:
+        raise ValueError("rate_cps must be positive")
+    clock = clock if clock is not None else VirtualClock()
+    rng = random.Random(seed)
+    capacity = max(burst or chunk_size, chunk_size)
+    tokens = float(capacity)
+    released_at = clock.time()  # shaping time of the last release
+    refilled_at = released_at
+    last_arrival = released_at
+
+    for i in range(0, len(data), chunk_size):
+        current_chunk = data[i : i + chunk_size]
+        needed = len(current_chunk)
+        tokens = min(capacity, tokens + (released_at - refilled_at) * rate_cps)
+        refilled_at = released_at
+        if tokens < needed:
+            released_at += (needed - tokens) / rate_cps
+            refilled_at = released_at
+            tokens = needed
+        tokens -= needed
+        # Jitter delays delivery but never reorders chunks
+        arrival = released_at + (abs(rng.gauss(0.0, jitter)) if jitter > 0 else 0.0)
+        last_arrival = max(last_arrival, arrival)
+        clock.sleep(last_arrival - clock.time())
+        if arrivals is not None:
+            arrivals.append((i + needed, last_arrival))
+        yield current_chunk
+        if pause_probability > 0 and rng.random() < pause_probability:
+            released_at += pause_sec
+
+def kmp_scanner(pattern):
+    """
+    Return a feed(chunk, matches) closure that continues one KMP scan.
+    """
+    lps = compute_lps(pattern)
+    state = [0, 0]
+    def feed(chunk, matches):
+        state[0], state[1] = kmp_feed(chunk, pattern, lps, state[0], state[1], matches)
+    return feed
+
+def naive_scanner(pattern):
+    """
+    Return a feed(chunk, matches) closure that continues one naive scan.
+    """
+    state = [pattern[:0], 0]
+    def feed(chunk, matches):
+        state[0], state[1] = naive_feed(chunk, pattern, state[0], state[1], matches)
+    return feed
+
+REPLAY_SCANNERS = {
+    "Naive Stream": naive_scanner,
+    "KMP Stream": kmp_scanner
+}
+
+def replay_simulation(data, pattern, rate_cps, engine="KMP Stream", **source_options):
+    """
+    Replay data at a simulated rate through one matcher, without sleeping.
+
+    Each chunk is processed when it has arrived and the matcher is free; its
+    measured CPU cost then advances the matcher's virtual busy time. Matches
+    are reported when the chunk that completes them has been processed.
+
+    Returns:
+        dict: match_count, simulated_duration_sec, cpu_time_sec, wall_time_sec,
+        utilization, max_queue_delay_sec and latency_p50/p95/p99/max_sec.
+    """
+    feed = REPLAY_SCANNERS[engine](pattern)
+    clock = VirtualClock()
+    matches = []
+    latencies = []
+    busy_until = 0.0
+    cpu_time = 0.0
+    max_queue_delay = 0.0
+
+    wall_start = time.perf_counter()
+    for chunk in rate_controlled_source(data, rate_cps, clock=clock, **source_options):
+        arrival = clock.time()
+        start = max(arrival, busy_until)
+        max_queue_delay = max(max_queue_delay, start - arrival)
+        found_before = len(matches)
+        cpu_start = time.process_time()
+        feed(chunk, matches)
+        cost = time.process_time() - cpu_start
+        cpu_time += cost
+        busy_until = start + cost
+        latencies.extend([busy_until - arrival] * (len(matches) - found_before))
+    wall_time = time.perf_counter() - wall_start
+
+    simulated_duration = max(busy_until, clock.time())
+    summary = latency_percentiles(latencies)
+    return {
+        "match_count": len(matches),
+        "simulated_duration_sec": simulated_duration,
+        "cpu_time_sec": cpu_time,
+        "wall_time_sec": wall_time,
+        "utilization": cpu_time / simulated_duration if simulated_duration > 0 else float('nan'),
+        "max_queue_delay_sec": max_queue_delay,
+        "latency_p50_sec": summary["p50"],
+        "latency_p95_sec": summary["p95"],
+        "latency_p99_sec": summary["p99"],
+        "latency_max_sec": summary["max"]
+    }
+
+if __name__ == "__main__":
+    with open("flow_sequences.txt", 'r', encoding='utf-8') as f:
+        text = "".join(line.split(':', 1)[1].strip() for line in f if ':' in line) * 200
+    # 20 characters per second (the 0.05s per-character delay used in
+    # NaiveKMP/pattern_matching.py), which would take hours to replay in real time
+    for engine in REPLAY_SCANNERS:
+        result = replay_simulation(text, "xxxxxxx", rate_cps=20, engine=engine,
+                                   chunk_size=1, jitter=0.01, seed=0)
+        print(f"{engine}: {result['match_count']} matches, simulated "
+              f"{result['simulated_duration_sec'] / 3600:.2f}h in {result['wall_time_sec']:.2f}s wall, "
+              f"CPU {result['cpu_time_sec']:.4f}s, p99 latency {result['latency_p99_sec'] * 1e6:.1f}us")
@@ -0,0 +1,168 @@
+## Content-addressed cache of match results
+# Results are keyed by hashes of the engine name, the pattern and the text,
+# so an identical (engine, pattern, text) triple is only scanned once, even
+# when it appears under different IPs or files. The key also holds a
+# fingerprint of the engine's code, so editing an engine invalidates its old
+# entries. Recently used results stay in an in-memory LRU; an optional disk
+# tier keeps them across runs. Only results are cached, never timings: a
+# cached result took no time to produce in this run.
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+from array import array
+from collections import OrderedDict
+
+DEFAULT_RESULT_CACHE_DIR = ".result_cache"
+DEFAULT_MAX_ENTRIES = 4096
+
+def content_digest(data):
+    """
+    SHA-256 of a str, bytes-like or array value. The type is part of the
+    digest, so 'ab' and b'ab' hash differently.
+    """
+    if isinstance(data, str):
+        tag, payload = b"str:", data.encode('utf-8')
+    elif isinstance(data, array):
+        tag, payload = f"array({data.typecode}):".encode('ascii'), data.tobytes()
+    else:
+        tag, payload = b"bytes:", bytes(data)
+    return hashlib.sha256(tag + payload).hexdigest()
+
+def engine_fingerprint(engine):
+    """
+    Hash of the source of the module defining engine (so edits to its helpers
+    count too) and of its name. functools.partial engines add their plain
+    (str/number/bool/None) bound arguments; objects such as a PatternRegistry
+    do not change results and are left out.
+    """
+    digest = hashlib.sha256()
+    while isinstance(engine, functools.partial):
+        bound = [repr(arg) for arg in engine.args if isinstance(arg, (str, int, float, bool, type(None)))]
+        bound += [f"{name}={value!r}" for name, value in sorted(engine.keywords.items())
+                  if isinstance(value, (str, int, float, bool, type(None)))]
+        digest.update(repr(bound).encode('utf-8'))
+        engine = engine.func
+    digest.update(f"{getattr(engine, '__module__', '')}.{getattr(engine, '__qualname__', repr(engine))}".encode('utf-8'))
+    try:
+        digest.update(inspect.getsource(inspect.getmodule(engine)).encode('utf-8'))
+    except (TypeError, OSError):
+        code = getattr(engine, '__code__', None)
+        if code is not None:
+            digest.update(code.co_code)
+    return digest.hexdigest()
+
+def result_key(engine_name, pattern, text, engine_version=""):
+    digest = hashlib.sha256()
+    for part in (engine_name, engine_version, pattern, text):
+        digest.update(content_digest(part).encode('ascii'))
+    return digest.hexdigest()
+
+class MatchResultCache:
+    """
+    LRU cache of match results with an optional pickle-per-entry disk tier.
+
+    Counters: hits (memory), disk_hits and misses.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.engine_versions = {}  # engine object -> engine_fingerprint()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Cached value for key, or None on a miss.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.disk_dir is not None and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"  Ignoring unreadable result cache entry {self._disk_path(key)}: {e}")
+            else:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.disk_dir is not None:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def get_or_compute(self, engine_name, pattern, text, compute, cacheable=None, engine_version=""):
+        """
+        Return (result, cached). On a miss, compute() is called and its result
+        stored unless cacheable(result) is false (e.g. for failed runs).
+        """
+        key = result_key(engine_name, pattern, text, engine_version)
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self.put(key, value)
+        return value, False
+
+    def get_or_time(self, engine_name, engine, pattern, text, timed_run, cacheable=None):
+        """
+        Cached variant of a timed engine run.
+
+        timed_run() must return (*result, time_sec). Only result is cached,
+        keyed with engine's fingerprint.
+
+        Returns:
+            tuple: (result, time_sec, cached); time_sec is None when cached,
+            since nothing was run.
+        """
+        if engine not in self.engine_versions:
+            self.engine_versions[engine] = engine_fingerprint(engine)
+        timings = []
+
+        def compute():
+            *result, elapsed = timed_run()
+            timings.append(elapsed)
+            return tuple(result)
+
+        result, cached = self.get_or_compute(engine_name, pattern, text, compute, cacheable,
+                                             self.engine_versions[engine])
+        return result, (None if cached else timings[0]), cached
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self.entries)
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['hits']} memory hits, {stats['disk_hits']} disk hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate, {stats['entries']} entries in memory)")
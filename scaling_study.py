@@ -0,0 +1,269 @@
+## Complexity-scaling study with fitted growth exponents
+# Sweeps text length n, pattern length m and alphabet size k over several
+# orders of magnitude on the workload families, fits a log-log slope (the
+# growth exponent) with a confidence interval for every engine and metric,
+# and flags engines whose measured exponent falls outside the expected one.
+
+import contextlib
+import csv
+import io
+import math
+import time
+
+import numpy as np
+
+from functions import (
+    stream_data,
+    naive_stream_matching_with_counts,
+    kmp_stream_matching_with_counts
+)
+from workload_families import generate_workload
+
+# Comparisons and time both come from the per-symbol counting engines, so the
+# time exponent measures the same work the comparison exponent counts (the
+# chunked naive engine compares each window with one C-level slice
+# comparison, which hides its dependence on m)
+SCALING_ENGINES = {
+    "Naive Stream": naive_stream_matching_with_counts,
+    "KMP Stream": kmp_stream_matching_with_counts
+}
+
+# Each sweep varies one parameter with the others fixed. "expected" gives,
+# per engine, the exponent it should show in the swept parameter for that
+# family: a number, a (low, high) range, None (no claim), or a dict with
+# separate "comparisons" and "time_sec" entries.
+SCALING_SWEEPS = [
+    {
+        "name": "text_length", "family": "uniform_random",
+        "values": [1000, 3000, 10000, 30000, 100000, 300000, 1000000],
+        "fixed": {"m": 16, "alphabet_size": 4},
+        "expected": {"Naive Stream": 1.0, "KMP Stream": 1.0}
+    },
+    {
+        "name": "text_length", "family": "adversarial_naive",
+        "values": [1000, 3000, 10000, 30000, 100000, 300000],
+        "fixed": {"m": 16, "alphabet_size": 2},
+        "expected": {"Naive Stream": 1.0, "KMP Stream": 1.0}
+    },
+    {
+        "name": "pattern_length", "family": "adversarial_naive",
+        "values": [2, 4, 8, 16, 32, 64, 128, 256, 512],
+        "fixed": {"n": 20000, "alphabet_size": 2},
+        # Naive time is a per-symbol cost plus O(m) per window, so its slope
+        # only approaches 1 as m grows
+        "expected": {"Naive Stream": {"comparisons": 1.0, "time_sec": (0.5, 1.0)}, "KMP Stream": 0.0}
+    },
+    {
+        "name": "pattern_length", "family": "adversarial_kmp",
+        "values": [2, 4, 8, 16, 32, 64, 128, 256, 512],
+        "fixed": {"n": 20000, "alphabet_size": 2},
+        # Targets KMP's failure links; no claim for Naive
+        "expected": {"Naive Stream": None, "KMP Stream": 0.0}
+    },
+    {
+        "name": "alphabet_size", "family": "uniform_random",
+        "values": [2, 3, 4, 6, 8, 12, 16, 26],
+        "fixed": {"n": 100000, "m": 16},
+        # Does not grow with the alphabet; fewer partial matches make it shrink
+        "expected": {"Naive Stream": (-0.5, 0.0), "KMP Stream": (-0.5, 0.0)}
+    }
+]
+
+# A measured exponent is flagged when its whole confidence interval lies
+# more than this far above or below the expected exponent (range)
+EXPONENT_TOLERANCE = 0.1
+CONFIDENCE = 0.95
+TIMING_REPEATS = 3
+SEED = 448
+
+# Swept parameter -> (generate_workload argument, MEASUREMENT_HEADER column)
+SWEEP_PARAMETERS = {
+    "text_length": ("n", 3),
+    "pattern_length": ("m", 4),
+    "alphabet_size": ("alphabet_size", 5)
+}
+
+MEASUREMENT_HEADER = [
+    "sweep", "family", "engine", "text_length", "pattern_length", "alphabet_size",
+    "match_count", "comparisons", "time_sec"
+]
+FIT_HEADER = [
+    "sweep", "family", "engine", "metric", "points", "exponent", "ci_low", "ci_high",
+    "expected_low", "expected_high", "deviation"
+]
+
+def t_critical(confidence, dof):
+    """
+    Two-sided Student t critical value. Falls back to the normal quantile
+    when scipy is not installed (slightly narrow for few points).
+    """
+    try:
+        from scipy import stats
+        return float(stats.t.ppf(0.5 + confidence / 2, dof))
+    except ImportError:
+        from statistics import NormalDist
+        return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def fit_loglog_slope(x, y, confidence=CONFIDENCE):
+    """
+    Least-squares fit of log(y) = a + b log(x).
+
+    Returns:
+        tuple: (slope b, intercept a, ci_low, ci_high) with a confidence
+        interval on b from the residual standard error.
+    """
+    log_x = np.log(np.asarray(x, dtype=float))
+    log_y = np.log(np.asarray(y, dtype=float))
+    slope, intercept = np.polyfit(log_x, log_y, 1)
+    if len(log_x) < 3:
+        return slope, intercept, float('nan'), float('nan')
+    residuals = log_y - (intercept + slope * log_x)
+    dof = len(log_x) - 2
+    sxx = np.sum((log_x - log_x.mean()) ** 2)
+    stderr = math.sqrt(np.sum(residuals ** 2) / dof / sxx)
+    margin = t_critical(confidence, dof) * stderr
+    return slope, intercept, slope - margin, slope + margin
+
+def measure_engine(engine, text, pattern, repeats=TIMING_REPEATS):
+    """
+    Comparisons and best-of-repeats time of one counting engine.
+    """
+    best_time = float('inf')
+    # The counting engines print as they run; keep the study's output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            stream = stream_data(text)
+            start = time.perf_counter()
+            matches, comparisons = engine(stream, pattern)
+            best_time = min(best_time, time.perf_counter() - start)
+    return len(matches), comparisons, best_time
+
+def run_sweep(sweep, rng):
+    """
+    Measure every engine at every value of one sweep.
+
+    Returns:
+        list: Rows in MEASUREMENT_HEADER order.
+    """
+    rows = []
+    for value in sweep["values"]:
+        params = dict(sweep["fixed"])
+        params[SWEEP_PARAMETERS[sweep["name"]][0]] = value
+        text, pattern = generate_workload(sweep["family"], params["n"], params["m"], params["alphabet_size"], rng)
+        for engine_name, engine in SCALING_ENGINES.items():
+            match_count, comparisons, elapsed = measure_engine(engine, text, pattern)
+            rows.append([sweep["name"], sweep["family"], engine_name, len(text), len(pattern),
+                         params["alphabet_size"], match_count, comparisons, elapsed])
+        print(f"  {sweep['family']:18s} {sweep['name']}={value}")
+    return rows
+
+def expected_range(sweep, engine_name, metric):
+    """
+    (low, high) expected exponent of one engine and metric in a sweep, or None.
+    """
+    expected = sweep["expected"][engine_name]
+    if isinstance(expected, dict):
+        expected = expected[metric]
+    if expected is None or isinstance(expected, tuple):
+        return expected
+    return expected, expected
+
+def fit_sweep(sweep, rows):
+    """
+    Fit the growth exponent of comparisons and time for each engine in a sweep.
+
+    Returns:
+        list: Rows in FIT_HEADER order.
+    """
+    column = SWEEP_PARAMETERS[sweep["name"]][1]
+    fits = []
+    for engine_name in SCALING_ENGINES:
+        engine_rows = [row for row in rows if row[2] == engine_name]
+        x = [row[column] for row in engine_rows]
+        for metric, index in (("comparisons", 7), ("time_sec", 8)):
+            slope, _, ci_low, ci_high = fit_loglog_slope(x, [row[index] for row in engine_rows])
+            expected = expected_range(sweep, engine_name, metric)
+            # NaN bounds (too few points) never flag
+            deviation = ""
+            if expected is not None and ci_low > expected[1] + EXPONENT_TOLERANCE:
+                deviation = "above"
+            elif expected is not None and ci_high < expected[0] - EXPONENT_TOLERANCE:
+                deviation = "below"
+            low, high = expected if expected is not None else (float('nan'), float('nan'))
+            fits.append([sweep["name"], sweep["family"], engine_name, metric, len(x),
+                         slope, ci_low, ci_high, low, high, deviation])
+    return fits
+
+def plot_sweep(sweep, rows, filename):
+    """
+    Log-log plot of comparisons and time against the swept parameter, with fitted lines.
+    """
+    # Plotting is optional: the measurements and fits do not need matplotlib
+    import matplotlib.pyplot as plt
+    from preprocess_data import get_algorithm_color, save_plot
+
+    column = SWEEP_PARAMETERS[sweep["name"]][1]
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    for ax, (metric, index, label) in zip(axes, (("comparisons", 7, "Number of Comparisons"),
+                                                  ("time_sec", 8, "Execution Time (s)"))):
+        for engine_name in SCALING_ENGINES:
+            engine_rows = [row for row in rows if row[2] == engine_name]
+            x = np.array([row[column] for row in engine_rows], dtype=float)
+            y = np.array([row[index] for row in engine_rows], dtype=float)
+            slope, intercept, ci_low, ci_high = fit_loglog_slope(x, y)
+            color = get_algorithm_color(engine_name)
+            ax.loglog(x, y, marker='o', linestyle='none', color=color)
+            ax.loglog(x, np.exp(intercept) * x ** slope, linestyle='--', color=color,
+                      label=f"{engine_name}: slope {slope:.2f} [{ci_low:.2f}, {ci_high:.2f}]")
+        ax.set_xlabel(f"{sweep['name'].replace('_', ' ').title()} (log scale)")
+        ax.set_ylabel(f"{label} (log scale)")
+        ax.set_title(f"Scaling of {label} vs. {sweep['name'].replace('_', ' ').title()} ({sweep['family']})")
+        ax.legend()
+        ax.grid(True, which="both", ls="--")
+    save_plot(fig, filename)
+
+def main(plot=True):
+    plotting = plot
+    if plotting:
+        try:
+            import matplotlib  # noqa: F401
+            import seaborn  # noqa: F401
+        except ImportError as e:
+            print(f"  Skipping plots ({e}); measurements and fits are still saved")
+            plotting = False
+    rng = np.random.default_rng(SEED)
+    measurements = []
+    fits = []
+    print("Running complexity-scaling study...")
+    for sweep in SCALING_SWEEPS:
+        rows = run_sweep(sweep, rng)
+        measurements.extend(rows)
+        sweep_fits = fit_sweep(sweep, rows)
+        fits.extend(sweep_fits)
+        if plotting:
+            plot_sweep(sweep, rows, f"scaling_{sweep['name']}_{sweep['family']}.png")
+
+    print("\nFitted growth exponents:")
+    for fit in fits:
+        flag = f"  <-- {fit[10]} expected" if fit[10] else ""
+        if fit[8] != fit[8]:
+            expected = "no claim"
+        elif fit[8] == fit[9]:
+            expected = f"expected {fit[8]:.1f}"
+        else:
+            expected = f"expected {fit[8]:.1f}..{fit[9]:.1f}"
+        print(f"  {fit[0]:14s} {fit[1]:18s} {fit[2]:12s} {fit[3]:11s}: "
+              f"{fit[5]:5.2f} [{fit[6]:5.2f}, {fit[7]:5.2f}] ({expected}){flag}")
+
+    for output_csv_filename, header, rows in (("scaling_study_measurements.csv", MEASUREMENT_HEADER, measurements),
+                                              ("scaling_study_fits.csv", FIT_HEADER, fits)):
+        with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    flagged = sum(1 for fit in fits if fit[10])
+    print(f"\n✅ Scaling study complete ({flagged} exponents outside expected). "
+          f"Results saved to scaling_study_measurements.csv and scaling_study_fits.csv")
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,112 @@
-import random
+import numpy as np
 
-def minority_oversampling(data, target_size):
+from generate_augmented_flows import default_rng
+
+def minority_oversampling(data, target_size, rng=None):
     """
     Oversamples the minority classes in the dataset to reach the target size.
     
     Args:
         data (list): List of original sequences.
         target_size (int): Desired number of sequences after oversampling.
+        rng (numpy.random.Generator): Random source (see default_rng()).
         
     Returns:
         list: Oversampled dataset.
     """
+    rng = default_rng(rng)
     original_size = len(data)
     oversampled_data = data[:]
     
     # Randomly duplicate minority samples to reach the target size
     while len(oversampled_data) < target_size:
-        sample = random.choice(data)
+        sample = data[rng.integers(len(data))]
         oversampled_data.append(sample)
     
     return oversampled_data
 
-def generate_variable_length_sequences(oversampled_sequences, text_lengths):
+def iter_repeated_blocks(seq, length, block_chars=1 << 20):
+    """
+    Yield seq repeated and truncated to length symbols, in blocks of at most
+    about block_chars symbols (always whole repeats, except the last block).
+    """
+    if not seq or length <= 0:
+        return
+    repeats_per_block = max(1, block_chars // len(seq))
+    block = seq * repeats_per_block
+    remaining = length
+    while remaining >= len(block):
+        yield block
+        remaining -= len(block)
+    if remaining:
+        yield block[:remaining]
+
+def generate_variable_length_sequences(oversampled_sequences, text_lengths, rng=None):
     """
     Generates sequences with variable lengths from the oversampled data.
     
     Args:
         oversampled_sequences (list): List of oversampled sequences.
         text_lengths (list): List of desired text lengths.
+        rng (numpy.random.Generator): Random source (see default_rng()).
         
     Returns:
         list: Formatted variable-length sequences.
     """
+    rng = default_rng(rng)
     generated_sequences = []
     for i, seq in enumerate(oversampled_sequences):
-        length = random.choice(text_lengths)  # Choose a random text length from the specified sizes
+        length = text_lengths[rng.integers(len(text_lengths))]  # Choose a random text length from the specified sizes
         # Adjust to the desired length
-        new_sequence = (seq * (length // len(seq))) + seq[:length % len(seq)]
+        new_sequence = ''.join(iter_repeated_blocks(seq, length))
         formatted_sequence = f"{i}: {new_sequence}"  # Correctly use the incrementing index
         generated_sequences.append(formatted_sequence)
     return generated_sequences
 
-def main(input_path, output_path, target_size):
+def write_variable_length_sequences(file, oversampled_sequences, text_lengths, rng=None):
+    """
+    Like generate_variable_length_sequences(), but writes each sequence to
+    file block by block instead of holding them all in memory.
+
+    Returns:
+        int: Number of sequences written.
+    """
+    rng = default_rng(rng)
+    count = 0
+    for i, seq in enumerate(oversampled_sequences):
+        length = text_lengths[rng.integers(len(text_lengths))]
+        file.write(f"{i}: ")
+        for block in iter_repeated_blocks(seq, length):
+            file.write(block)
+        file.write("\n")
+        count += 1
+    return count
+
+def main(input_path, output_path, target_size, seed=None):
+    # One Generator drives every random choice, so a seed reproduces the file
+    rng = np.random.default_rng(seed) if seed is not None else default_rng()
+
     # Load the original sequences from the input file
     with open(input_path, "r") as file:
-        original_sequences = [line.strip().split(": ", 1)[1] for line in file.readlines()]
+        original_sequences = [line.strip().split(": ", 1)[1] for line in file if line.strip()]
 
     # Apply minority oversampling to generate 20 to 50 sequences
-    oversampled_sequences = minority_oversampling(original_sequences, target_size=random.randint(20, 50))
+    oversampled_sequences = minority_oversampling(original_sequences,
+                                                  target_size=int(rng.integers(20, 50, endpoint=True)), rng=rng)
 
     # Define the text lengths based on Paper 1 (10k, 50k, 100k)
     text_lengths = [10000, 50000, 100000]
 
-    # Generate new sequences with variable lengths and correct indexing
-    generated_sequences = generate_variable_length_sequences(oversampled_sequences, text_lengths)
-
-    # Save the generated data to a new file
+    # Generate new sequences with variable lengths and correct indexing,
+    # writing each one straight to the output file
     with open(output_path, "w") as file:
-        file.write("\n".join(generated_sequences) + "\n")
+        count = write_variable_length_sequences(file, oversampled_sequences, text_lengths, rng)
 
-    print(f"Dataset generated successfully with {len(generated_sequences)} sequences at {output_path}")
+    print(f"Dataset generated successfully with {count} sequences at {output_path}")
 
-# Example usage
-input_path = "flow_sequences.txt"
-output_path = "oversampled_flow_sequences.txt"
-target_size = 50  # Maximum number of sequences
-main(input_path, output_path, target_size)
\ No newline at end of file
+if __name__ == "__main__":
+    # Example usage
+    input_path = "flow_sequences.txt"
+    output_path = "oversampled_flow_sequences.txt"
+    target_size = 50  # Maximum number of sequences
+    main(input_path, output_path, target_size, seed=448)
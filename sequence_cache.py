@@ -0,0 +1,76 @@
+## On-disk cache for encoded sequences
+# Results of the expensive CSV parse / flow bucketing / ASN encoding steps are
+# pickled under a key derived from the source files' content and the encoding
+# parameters (including a fingerprint of the builder code). Editing a source
+# file, a parameter or the builder changes the key, so stale entries are
+# never reused.
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+DEFAULT_CACHE_DIR = ".sequence_cache"
+
+def file_digest(path, block_size=1024 * 1024):
+    """
+    SHA-256 of a file's content, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_fingerprint(*objects):
+    """
+    SHA-256 of the source of the given functions, classes or modules, for use
+    as a cache parameter: editing any of them changes the key.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', obj.__name__)}".encode('utf-8'))
+        digest.update(inspect.getsource(obj).encode('utf-8'))
+    return digest.hexdigest()
+
+def cache_key(source_paths, params):
+    """
+    Cache key for the given source files and JSON-serializable parameters.
+    """
+    digest = hashlib.sha256()
+    for path in source_paths:
+        digest.update(file_digest(path).encode('ascii'))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_or_build(source_paths, params, build, cache_dir=DEFAULT_CACHE_DIR, label="data"):
+    """
+    Return the cached result for (source_paths, params), calling build() and
+    storing its result on a miss. A cache_dir of None disables caching.
+    """
+    if cache_dir is None:
+        return build()
+    key = cache_key(source_paths, params)
+    cache_path = os.path.join(cache_dir, f"{key}.pkl")
+    if os.path.exists(cache_path):
+        start = time.perf_counter()
+        try:
+            with open(cache_path, 'rb') as f:
+                result = pickle.load(f)
+            print(f"  Loaded cached {label} ({time.perf_counter() - start:.3f}s): {cache_path}")
+            return result
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"  Ignoring unreadable cache entry {cache_path}: {e}")
+
+    start = time.perf_counter()
+    result = build()
+    build_time = time.perf_counter() - start
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    print(f"  Built {label} in {build_time:.3f}s and cached it: {cache_path}")
+    return result
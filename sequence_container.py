@@ -0,0 +1,204 @@
+## Binary container for multi-IP sequence files
+# The 'ip: sequence' text files have to be read line by line and split on ':'
+# before any one IP can be reached. A container stores the raw symbol payloads
+# back to back with a table of (ip, encoding, offset, length, crc32) entries,
+# so a reader can seek straight to one IP's payload and stream it in chunks.
+#
+# Layout:
+#   magic (4 bytes) | version (u8) | table offset (u64)
+#   payload ... payload
+#   table: entry count (u32), then per entry
+#          ip (u16 length + utf-8) | encoding (u8 length + utf-8)
+#          | offset (u64) | length (u64, bytes) | crc32 (u32)
+# The table is written after the payloads so sequences can be added one at a
+# time without holding them all in memory; the preamble points to it.
+
+import codecs
+import os
+import struct
+import zlib
+
+from compressed_input import open_input
+
+CONTAINER_EXTENSION = ".seqc"
+CONTAINER_MAGIC = b"SQCN"
+CONTAINER_VERSION = 1
+DEFAULT_CHUNK_BYTES = 1 << 16
+
+_PREAMBLE = struct.Struct('<4sBQ')
+_ENTRY_FIELDS = struct.Struct('<QQI')
+
+class ContainerWriter:
+    """
+    Write sequences one at a time to a new container file.
+
+    Use as a context manager, or call close() to write the table. If the
+    with block raises, the partial file is removed instead (see abort()).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.entries = []
+        self.file.write(_PREAMBLE.pack(CONTAINER_MAGIC, CONTAINER_VERSION, 0))
+
+    def add(self, ip, sequence, encoding="flow"):
+        payload = sequence.encode('utf-8')
+        self.entries.append((str(ip), encoding, self.file.tell(), len(payload), zlib.crc32(payload)))
+        self.file.write(payload)
+
+    def close(self):
+        if self.file.closed:
+            return
+        table_offset = self.file.tell()
+        self.file.write(struct.pack('<I', len(self.entries)))
+        for ip, encoding, offset, length, checksum in self.entries:
+            ip_bytes = ip.encode('utf-8')
+            encoding_bytes = encoding.encode('utf-8')
+            self.file.write(struct.pack('<H', len(ip_bytes)) + ip_bytes)
+            self.file.write(struct.pack('<B', len(encoding_bytes)) + encoding_bytes)
+            self.file.write(_ENTRY_FIELDS.pack(offset, length, checksum))
+        self.file.seek(0)
+        self.file.write(_PREAMBLE.pack(CONTAINER_MAGIC, CONTAINER_VERSION, table_offset))
+        self.file.close()
+
+    def abort(self):
+        """
+        Close without writing the table and delete the partial file.
+        """
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class SequenceContainer:
+    """
+    Random-access reader for a container file. Only the table is read on open;
+    payloads are read on demand.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic, version, table_offset = _PREAMBLE.unpack(self.file.read(_PREAMBLE.size))
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            self.file.close()
+            raise ValueError(f"'{path}' is not a version {CONTAINER_VERSION} sequence container")
+        if table_offset == 0:
+            self.file.close()
+            raise ValueError(f"'{path}' is incomplete (its writer was not closed)")
+
+        self.entries = {}  # (ip, encoding) -> (offset, length, crc32)
+        self.file.seek(table_offset)
+        count = struct.unpack('<I', self.file.read(4))[0]
+        for _ in range(count):
+            ip = self.file.read(struct.unpack('<H', self.file.read(2))[0]).decode('utf-8')
+            encoding = self.file.read(struct.unpack('<B', self.file.read(1))[0]).decode('utf-8')
+            self.entries[(ip, encoding)] = _ENTRY_FIELDS.unpack(self.file.read(_ENTRY_FIELDS.size))
+
+    def ips(self, encoding="flow"):
+        return [ip for ip, entry_encoding in self.entries if entry_encoding == encoding]
+
+    def length(self, ip, encoding="flow"):
+        return self.entries[(str(ip), encoding)][1]
+
+    def iter_chunks(self, ip, encoding="flow", chunk_size=DEFAULT_CHUNK_BYTES, verify=True):
+        """
+        Yield one IP's sequence as str chunks of at most chunk_size symbols.
+
+        The checksum is checked once the whole payload has been read; a
+        mismatch raises ValueError after the last chunk.
+        """
+        offset, length, checksum = self.entries[(str(ip), encoding)]
+        crc = 0
+        remaining = length
+        # Incremental decoding keeps multi-byte symbols split across chunks intact
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        while remaining > 0:
+            # Each read seeks, so interleaved readers of different IPs are safe
+            self.file.seek(offset + length - remaining)
+            block = self.file.read(min(chunk_size, remaining))
+            if not block:
+                raise ValueError(f"'{self.path}' is truncated in the payload for IP {ip}")
+            remaining -= len(block)
+            if verify:
+                crc = zlib.crc32(block, crc)
+            yield decoder.decode(block, final=(remaining == 0))
+        if verify and crc != checksum:
+            raise ValueError(f"Checksum mismatch for IP {ip} ({encoding}) in '{self.path}'")
+
+    def read(self, ip, encoding="flow", verify=True):
+        """
+        One IP's whole sequence as a str.
+        """
+        return ''.join(self.iter_chunks(ip, encoding, chunk_size=max(1, self.length(ip, encoding)),
+                                        verify=verify))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def write_container(path, sequences, encoding="flow"):
+    """
+    Write {ip: sequence} to a container file.
+    """
+    with ContainerWriter(path) as writer:
+        for ip, sequence in sequences.items():
+            writer.add(ip, sequence, encoding)
+
+def text_to_container(text_path, container_path, encoding="flow"):
+    """
+    Convert an 'ip: sequence' text file (plain or compressed), one line at a time.
+
+    Returns:
+        int: Number of sequences written.
+    """
+    count = 0
+    with open_input(text_path) as f, ContainerWriter(container_path) as writer:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ip_str, seq_str = line.split(':', 1)
+            except ValueError:
+                print(f"    Warning: Skipping malformed line in '{text_path}': {line}")
+                continue
+            writer.add(ip_str.strip(), seq_str.strip(), encoding)
+            count += 1
+    return count
+
+def container_to_text(container_path, text_path, encoding="flow"):
+    """
+    Write a container's sequences back out as 'ip: sequence' lines.
+    """
+    with SequenceContainer(container_path) as container, open(text_path, 'w', encoding='utf-8') as f:
+        for ip in container.ips(encoding):
+            f.write(f"{ip}: ")
+            for chunk in container.iter_chunks(ip, encoding):
+                f.write(chunk)
+            f.write("\n")
+
+if __name__ == "__main__":
+    import time
+
+    for size_mb in [10, 20, 30, 40, 50]:
+        text_path = f"flow_sequences_{size_mb}mb.txt"
+        if not os.path.exists(text_path):
+            continue
+        container_path = f"flow_sequences_{size_mb}mb{CONTAINER_EXTENSION}"
+        start = time.perf_counter()
+        count = text_to_container(text_path, container_path)
+        print(f"Converted '{text_path}' -> '{container_path}': {count} sequences "
+              f"in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,151 @@
+## Per-IP, date-sorted index over the flow log
+# Built once from the DataFrame; afterwards any [start, end) window for any IP
+# is two binary searches plus a slice, instead of a boolean-mask scan of every row.
+# PositionDateIndex maps match offsets in the encoded sequences back to dates.
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+def to_day(value):
+    """
+    Convert a date string, Timestamp or datetime64 to an integer day number.
+    """
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+class FlowLogIndex:
+    """
+    Flow log rows sorted by (l_ipn, date), with each IP's rows and daily
+    aggregates stored as contiguous ranges.
+
+    Row-level arrays (ASN windows):  row_day, row_asn, row_flow
+    Daily arrays (flow windows):     day_day, day_flow, day_cumflow
+    ip_rows[ip] / ip_days[ip] hold the (start, end) range of each IP.
+    """
+    def __init__(self, df):
+        df_sorted = df.sort_values(by=['l_ipn', 'date'])
+        ips = df_sorted['l_ipn'].to_numpy()
+        self.row_day = pd.to_datetime(df_sorted['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        self.row_asn = df_sorted['r_asn'].to_numpy()
+        self.row_flow = df_sorted['f'].to_numpy()
+        self.ip_rows = self._ranges(ips)
+
+        # Daily totals per IP: rows are already grouped by (ip, day), so each
+        # run of equal (ip, day) keys collapses to one entry.
+        new_day = np.ones(len(ips), dtype=bool)
+        new_day[1:] = (ips[1:] != ips[:-1]) | (self.row_day[1:] != self.row_day[:-1])
+        starts = np.flatnonzero(new_day)
+        self.day_day = self.row_day[starts]
+        self.day_flow = np.add.reduceat(self.row_flow, starts) if len(starts) else self.row_flow[:0]
+        self.day_cumflow = np.concatenate(([0], np.cumsum(self.day_flow)))
+        self.ip_days = self._ranges(ips[starts])
+
+    @staticmethod
+    def _ranges(keys):
+        ranges = {}
+        if len(keys) == 0:
+            return ranges
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(keys)]))
+        for start, end in zip(starts, ends):
+            ranges[keys[start].item()] = (int(start), int(end))
+        return ranges
+
+    def _window(self, ranges, days, ip, start_date, end_date):
+        start, end = ranges.get(ip, (0, 0))
+        lo = start + int(np.searchsorted(days[start:end], to_day(start_date), side='left'))
+        hi = start + int(np.searchsorted(days[start:end], to_day(end_date), side='left'))
+        return lo, max(lo, hi)
+
+    def asn_window(self, ip, start_date, end_date):
+        """
+        r_asn of every row for ip with start_date <= date < end_date, in sequence order.
+        """
+        lo, hi = self._window(self.ip_rows, self.row_day, ip, start_date, end_date)
+        return self.row_asn[lo:hi]
+
+    def flow_window(self, ip, start_date, end_date):
+        """
+        Daily flow totals for ip with start_date <= date < end_date.
+        """
+        lo, hi = self._window(self.ip_days, self.day_day, ip, start_date, end_date)
+        return self.day_flow[lo:hi]
+
+    def flow_total(self, ip, start_date, end_date):
+        """
+        Total flows for ip in [start_date, end_date) from the cumulative sums.
+        """
+        lo, hi = self._window(self.ip_days, self.day_day, ip, start_date, end_date)
+        return int(self.day_cumflow[hi] - self.day_cumflow[lo])
+
+    def flow_pattern(self, ip, start_date, end_date, bucket):
+        """
+        Flow-level pattern string for the window, one bucket() symbol per day.
+        """
+        return ''.join(bucket(f) for f in self.flow_window(ip, start_date, end_date))
+
+    def asn_pattern(self, ip, start_date, end_date, asn_to_char):
+        """
+        ASN pattern string for the window, encoded with asn_to_char.
+        """
+        return ''.join(asn_to_char[asn] for asn in self.asn_window(ip, start_date, end_date).tolist()
+                       if asn in asn_to_char)
+
+class PositionDateIndex:
+    """
+    Companion index mapping offsets in one IP's encoded sequence to dates.
+
+    Stores, for every day present in the sequence, the day's ordinal and the
+    offset of its first symbol, as two compact arrays (12 bytes per day,
+    independent of how many symbols a day contributes).
+    """
+    def __init__(self):
+        self.day_ordinals = array('i')
+        self.day_starts = array('q')
+
+    def append(self, day, offset):
+        """
+        Record that the symbol at offset belongs to day. Offsets must be
+        appended in increasing order; only the first symbol of a day is stored.
+        """
+        ordinal = pd.Timestamp(day).toordinal()
+        if not self.day_ordinals or self.day_ordinals[-1] != ordinal:
+            self.day_ordinals.append(ordinal)
+            self.day_starts.append(offset)
+
+    def truncate(self, offset):
+        """
+        Forget the days whose first symbol is at or after offset.
+        """
+        while self.day_starts and self.day_starts[-1] >= offset:
+            self.day_starts.pop()
+            self.day_ordinals.pop()
+
+    def date_of(self, position):
+        """
+        Calendar date of the symbol at position.
+        """
+        k = bisect_right(self.day_starts, position) - 1
+        if k < 0:
+            raise IndexError(f"Position {position} is before the first indexed day")
+        return date.fromordinal(self.day_ordinals[k])
+
+    def date_range(self, position, length):
+        """
+        (first_date, last_date) covered by a match of length symbols at position.
+        """
+        return self.date_of(position), self.date_of(position + max(length, 1) - 1)
+
+    def offset_range(self, start_date, end_date, sequence_length):
+        """
+        (start, end) symbol offsets covering the days in [start_date, end_date).
+        """
+        lo = bisect_left(self.day_ordinals, pd.Timestamp(start_date).toordinal())
+        hi = bisect_left(self.day_ordinals, pd.Timestamp(end_date).toordinal())
+        start = self.day_starts[lo] if lo < len(self.day_starts) else sequence_length
+        end = self.day_starts[hi] if hi < len(self.day_starts) else sequence_length
+        return start, end
@@ -0,0 +1,339 @@
+## Incremental, persisted per-IP sequence store
+# Keeps the encoded flow and ASN sequences, their date indexes and the KMP
+# state of every registered pattern on disk. A refresh reads only the bytes
+# appended to the flow log since the last run, so a daily refresh costs time
+# proportional to the new day (plus the re-emitted last day), not to the
+# whole history.
+
+import csv
+import os
+import pickle
+
+from functions import compute_lps, kmp_feed
+from main import flow_bucket, asn_code
+from sequence_index import PositionDateIndex
+
+class SequenceStore:
+    """
+    Per-IP flow and ASN sequences built incrementally from an append-only flow log.
+
+    The flow log must be appended in date order. The last ingested date (the
+    watermark) is kept open: its symbols, the day's flow totals and ASN codes,
+    and every pattern's KMP state from before the day are held back, so rows
+    for the watermark day that arrive in a later refresh are folded into the
+    day and it is re-emitted. Rows dated before the watermark raise
+    ValueError. ASN codes are assigned in order of first appearance (main.py
+    sorts all ASNs up front, which an incremental store cannot do), so codes
+    stay stable across refreshes.
+    """
+    def __init__(self, source_path):
+        self.source_path = source_path
+        self.reset()
+
+    def reset(self):
+        self.header = None
+        self.byte_offset = 0
+        self.watermark = None
+        self.asn_to_char = {}
+        self.flow_sequences = {}  # ip -> appended segments, joined on read
+        self.asn_sequences = {}
+        self.lengths = {}         # (encoding, ip) -> symbols stored, open day excluded
+        self.flow_date_index = {}
+        self.asn_date_index = {}
+        self.patterns = {}        # name -> (encoding, pattern, lps)
+        self.matcher_states = {}  # (name, ip) -> KMP j
+        self.matches = {}         # (name, ip) -> match positions
+        # Last (open) day of each IP: its rows so far, its symbols and the
+        # (KMP j, match count) of each pattern from before its symbols
+        self.open_days = {}       # ip -> (day, flow total, [ASN codes])
+        self.open_symbols = {}    # (encoding, ip) -> symbols of the open day
+        self.checkpoints = {}     # (name, ip) -> (j, match count)
+
+    @classmethod
+    def load(cls, store_path, source_path):
+        """
+        Load a saved store, or start an empty one if store_path does not exist.
+        """
+        if os.path.exists(store_path):
+            with open(store_path, 'rb') as f:
+                store = pickle.load(f)
+            if not hasattr(store, "open_days"):
+                print(f"  Store '{store_path}' predates open-day tracking. Starting fresh.")
+            elif store.source_path == source_path:
+                return store
+            else:
+                print(f"  Store '{store_path}' was built from '{store.source_path}'. Starting fresh.")
+        return cls(source_path)
+
+    def save(self, store_path):
+        tmp_path = store_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, store_path)
+
+    def _sequences(self, encoding):
+        if encoding == "flow":
+            return self.flow_sequences
+        if encoding == "asn":
+            return self.asn_sequences
+        raise ValueError(f"Unknown encoding '{encoding}'")
+
+    def _date_index(self, encoding, ip):
+        date_index = self.flow_date_index if encoding == "flow" else self.asn_date_index
+        return date_index.setdefault(ip, PositionDateIndex())
+
+    def _closed_sequence(self, ip, encoding):
+        segments = self._sequences(encoding).get(ip)
+        if not segments:
+            return ""
+        if len(segments) > 1:
+            segments[:] = [''.join(segments)]
+        return segments[0]
+
+    def sequence(self, ip, encoding="flow"):
+        """
+        Full encoded sequence for ip, open day included (empty if the IP has not been seen).
+        """
+        return self._closed_sequence(ip, encoding) + self.open_symbols.get((encoding, ip), "")
+
+    def _ips(self, encoding):
+        return set(self._sequences(encoding)) | {ip for key_encoding, ip in self.open_symbols
+                                                  if key_encoding == encoding}
+
+    def add_pattern(self, name, pattern, encoding="flow"):
+        """
+        Register a pattern to be matched against every IP's sequence. Existing
+        sequences are scanned once; later refreshes only scan new symbols.
+        """
+        if not pattern:
+            raise ValueError("Pattern must not be empty")
+        self._sequences(encoding)
+        self.patterns[name] = (encoding, pattern, compute_lps(pattern))
+        for ip in self._ips(encoding):
+            self.matcher_states[(name, ip)] = 0
+            self.matches[(name, ip)] = []
+            self._scan(name, ip, self._closed_sequence(ip, encoding), 0)
+            self.checkpoints[(name, ip)] = (self.matcher_states[(name, ip)], len(self.matches[(name, ip)]))
+            self._scan(name, ip, self.open_symbols.get((encoding, ip), ""), self.lengths.get((encoding, ip), 0))
+
+    def _scan(self, name, ip, new_symbols, position):
+        _, pattern, lps = self.patterns[name]
+        found = []
+        j = self.matcher_states.get((name, ip), 0)
+        self.matcher_states[(name, ip)], _ = kmp_feed(new_symbols, pattern, lps, j, position, found)
+        self.matches.setdefault((name, ip), []).extend(found)
+        return found
+
+    def _scan_patterns(self, encoding, ip, new_symbols, position):
+        found = []
+        for name, (pattern_encoding, _, _) in self.patterns.items():
+            if pattern_encoding == encoding:
+                found.extend((name, ip, match) for match in self._scan(name, ip, new_symbols, position))
+        return found
+
+    def _append(self, encoding, ip, symbols, days):
+        index = self._date_index(encoding, ip)
+        start = self.lengths.get((encoding, ip), 0)
+        position = start
+        for symbol, day in zip(symbols, days):
+            index.append(day, position)
+            position += len(symbol)
+        new_symbols = ''.join(symbols)
+        # Appending a segment (rather than rebuilding the string) keeps the
+        # cost of a refresh independent of the history length
+        self._sequences(encoding).setdefault(ip, []).append(new_symbols)
+        self.lengths[(encoding, ip)] = position
+        return self._scan_patterns(encoding, ip, new_symbols, start)
+
+    def _open(self, encoding, ip, symbols, day):
+        """
+        Emit the symbols of ip's open day, checkpointing every pattern first.
+        """
+        position = self.lengths.get((encoding, ip), 0)
+        for name, (pattern_encoding, _, _) in self.patterns.items():
+            if pattern_encoding == encoding:
+                self.checkpoints[(name, ip)] = (self.matcher_states.get((name, ip), 0),
+                                                len(self.matches.get((name, ip), [])))
+        self._date_index(encoding, ip).append(day, position)
+        new_symbols = ''.join(symbols)
+        self.open_symbols[(encoding, ip)] = new_symbols
+        return self._scan_patterns(encoding, ip, new_symbols, position)
+
+    def _retract(self, encoding, ip):
+        """
+        Drop ip's open-day symbols and rewind the patterns to their checkpoints.
+
+        Returns:
+            set: (pattern_name, ip, position) matches that were withdrawn.
+        """
+        withdrawn = set()
+        if self.open_symbols.pop((encoding, ip), None) is None:
+            return withdrawn
+        self._date_index(encoding, ip).truncate(self.lengths.get((encoding, ip), 0))
+        for name, (pattern_encoding, _, _) in self.patterns.items():
+            if pattern_encoding == encoding and (name, ip) in self.checkpoints:
+                j, count = self.checkpoints.pop((name, ip))
+                withdrawn.update((name, ip, match) for match in self.matches[(name, ip)][count:])
+                del self.matches[(name, ip)][count:]
+                self.matcher_states[(name, ip)] = j
+        return withdrawn
+
+    def _read_new_rows(self):
+        """
+        Returns:
+            tuple: (columns, rows, bytes consumed past self.byte_offset).
+        """
+        with open(self.source_path, 'rb') as f:
+            header = f.readline()
+            size = os.fstat(f.fileno()).st_size
+            if self.header is not None and (header != self.header or size < self.byte_offset):
+                print(f"  '{self.source_path}' was rewritten, not appended. Rebuilding the store.")
+                patterns = {name: (encoding, pattern) for name, (encoding, pattern, _) in self.patterns.items()}
+                self.reset()
+                for name, (encoding, pattern) in patterns.items():
+                    self.patterns[name] = (encoding, pattern, compute_lps(pattern))
+            if self.header is None:
+                self.header = header
+                self.byte_offset = f.tell()
+            f.seek(self.byte_offset)
+            data = f.read()
+        # Only consume complete lines; a partially written last line is picked
+        # up by the next refresh.
+        end = data.rfind(b'\n') + 1
+        columns = next(csv.reader([self.header.decode('utf-8')]))
+        return columns, [row for row in csv.reader(data[:end].decode('utf-8').splitlines()) if row], end
+
+    def refresh(self):
+        """
+        Ingest rows appended to the flow log since the last refresh.
+
+        Rows for the watermark day are merged into that day, which is
+        re-emitted. Rows dated before the watermark raise ValueError and the
+        refresh is not applied, so no row is ever dropped silently.
+
+        Returns:
+            dict: rows_ingested, watermark, new_matches, a list of
+            (pattern_name, ip, position) found in the new data, and
+            withdrawn_matches, previously reported matches that late rows for
+            the re-emitted day (e.g. a changed flow bucket) no longer produce.
+        """
+        columns, rows, consumed = self._read_new_rows()
+        date_col = columns.index('date')
+        ip_col = columns.index('l_ipn')
+        asn_col = columns.index('r_asn')
+        flow_col = columns.index('f')
+
+        if self.watermark is not None:
+            late = [row for row in rows if row[date_col] < self.watermark]
+            if late:
+                raise ValueError(f"{len(late)} new rows in '{self.source_path}' are dated before the watermark "
+                                 f"{self.watermark} (first: {late[0]}); the flow log must be appended in date order")
+
+        daily_flows = {}  # ip -> {date: total}
+        asn_rows = {}     # ip -> [(date, code)]
+        latest = self.watermark
+        for row in rows:
+            day = row[date_col]
+            ip = int(row[ip_col])
+            asn = int(row[asn_col])
+            ip_days = daily_flows.setdefault(ip, {})
+            ip_days[day] = ip_days.get(day, 0) + int(row[flow_col])
+            code = self.asn_to_char.get(asn)
+            if code is None:
+                code = self.asn_to_char[asn] = asn_code(len(self.asn_to_char))
+            asn_rows.setdefault(ip, []).append((day, code))
+            latest = day if latest is None or day > latest else latest
+
+        withdrawn = set()
+        found = []
+        for ip in sorted(daily_flows):
+            # Fold the IP's open day back into the batch and re-emit it
+            if ip in self.open_days:
+                open_day, open_flow, open_codes = self.open_days.pop(ip)
+                withdrawn |= self._retract("flow", ip) | self._retract("asn", ip)
+                daily_flows[ip][open_day] = daily_flows[ip].get(open_day, 0) + open_flow
+                asn_rows[ip] = [(open_day, code) for code in open_codes] + asn_rows[ip]
+
+            days = sorted(daily_flows[ip])
+            closed_days = days[:-1] if days[-1] == latest else days
+            found.extend(self._append(
+                "flow", ip, [flow_bucket(daily_flows[ip][day]) for day in closed_days], closed_days))
+            # Stable sort keeps file order within a day, like main.py's sort by (l_ipn, date)
+            ip_rows = sorted(asn_rows[ip], key=lambda item: item[0])
+            closed_rows = [item for item in ip_rows if item[0] != latest]
+            found.extend(self._append(
+                "asn", ip, [code for _, code in closed_rows], [day for day, _ in closed_rows]))
+            if days[-1] == latest:
+                open_codes = [code for day, code in ip_rows if day == latest]
+                self.open_days[ip] = (latest, daily_flows[ip][latest], open_codes)
+                found.extend(self._open("flow", ip, [flow_bucket(daily_flows[ip][latest])], latest))
+                found.extend(self._open("asn", ip, open_codes, latest))
+
+        self.byte_offset += consumed
+        self.watermark = latest
+        found_set = set(found)
+        return {
+            "rows_ingested": len(rows),
+            "watermark": self.watermark,
+            # Matches withdrawn with a re-emitted day and found again are not new
+            "new_matches": [match for match in found if match not in withdrawn],
+            "withdrawn_matches": sorted(match for match in withdrawn if match not in found_set)
+        }
+
+def check_bucket_change(directory):
+    """
+    Self-check: a late row that moves the open day into another flow bucket
+    withdraws the match reported for the old bucket and reports the new one.
+    """
+    source_path = os.path.join(directory, "bucket_change.csv")
+    with open(source_path, 'w', encoding='utf-8') as f:
+        f.write("date,l_ipn,r_asn,f\n2006-07-01,0,701,5\n2006-07-02,0,701,5\n")
+    store = SequenceStore(source_path)
+    store.refresh()
+    store.add_pattern("aa", "aa", "flow")
+    store.add_pattern("ab", "ab", "flow")
+    assert store.matches[("aa", 0)] == [0] and store.matches[("ab", 0)] == []
+    # 5 + 50 flows on the open day: bucket 'a' becomes 'b'
+    with open(source_path, 'a', encoding='utf-8') as f:
+        f.write("2006-07-02,0,701,50\n")
+    summary = store.refresh()
+    assert summary["withdrawn_matches"] == [("aa", 0, 0)], summary
+    assert summary["new_matches"] == [("ab", 0, 0)], summary
+    assert store.sequence(0, "flow") == "ab"
+    # Unchanged bucket: the match is neither withdrawn nor reported again
+    with open(source_path, 'a', encoding='utf-8') as f:
+        f.write("2006-07-02,0,701,1\n")
+    summary = store.refresh()
+    assert summary["withdrawn_matches"] == [] and summary["new_matches"] == [], summary
+    print("  Bucket-change check passed")
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+    import pandas as pd
+    from main import compromise_info
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_bucket_change(directory)
+
+    store_path = "sequence_store.pkl"
+    source_path = "cs448b_ipasn.csv"
+    store = SequenceStore.load(store_path, source_path)
+    start = time.perf_counter()
+    summary = store.refresh()
+    if not store.patterns:
+        # Flow patterns for the 7-day windows before each compromise, as in main.py
+        for ip, date_str in compromise_info.items():
+            if ip not in store.flow_date_index:
+                continue
+            compromise_date = pd.to_datetime(date_str)
+            sequence = store.sequence(ip, "flow")
+            lo, hi = store.flow_date_index[ip].offset_range(
+                compromise_date - pd.Timedelta(days=7), compromise_date, len(sequence))
+            if hi > lo:
+                store.add_pattern(ip, sequence[lo:hi], "flow")
+    store.save(store_path)
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {summary['rows_ingested']} new rows up to {summary['watermark']} in {elapsed:.4f}s; "
+          f"{len(summary['new_matches'])} new matches, {len(summary['withdrawn_matches'])} withdrawn, "
+          f"{len(store.patterns)} patterns tracked")
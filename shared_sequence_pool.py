@@ -0,0 +1,225 @@
+## Zero-copy sequence sharing with worker processes
+# Every encoded sequence is copied once into multiprocessing.shared_memory
+# blocks. Jobs carry only (block name, offset, length) descriptors; a worker
+# attaches to the block once and scans a memoryview slice of it, so the data
+# sent per job stays a few bytes however long the sequences are. Both pool
+# engines read the view in place; the naive one copies only the few symbols
+# around each chunk boundary.
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+
+from functions import kmp_chunk_stream_matching
+
+def _owned(piece):
+    return bytes(piece) if isinstance(piece, memoryview) else piece
+
+def naive_view_stream_matching(chunks, pattern, match_times=None, max_matches=None):
+    """
+    Naive matching with the same results as naive_chunk_stream_matching, but
+    without concatenating each chunk onto the previous tail (which copies a
+    memoryview chunk into new bytes). Starts inside a chunk compare slices of
+    the chunk directly; starts in the carried tail are checked against a
+    buffer of at most 2 * (len(pattern) - 1) symbols.
+    """
+    m = len(pattern)
+    if not pattern: return []
+    if max_matches is not None and max_matches < 1: return []
+    matches = []
+    tail = pattern[:0]
+    position = 0  # Stream offset of the current chunk
+
+    def found(start):
+        matches.append(start)
+        if match_times is not None:
+            match_times.append(time.perf_counter())
+        return max_matches is not None and len(matches) >= max_matches
+
+    for chunk in chunks:
+        n = len(chunk)
+        if tail:
+            boundary = tail + _owned(chunk[:m - 1])
+            for s in range(len(tail)):
+                if boundary[s : s + m] == pattern and found(position - len(tail) + s):
+                    return matches
+        for s in range(n - m + 1):
+            if chunk[s : s + m] == pattern and found(position + s):
+                return matches
+        # Carry the last m - 1 symbols (fewer at the start of the stream)
+        keep = min(m - 1, len(tail) + n)
+        if keep == 0:
+            tail = pattern[:0]
+        elif n >= keep:
+            tail = _owned(chunk[n - keep :])
+        else:
+            tail = (tail + _owned(chunk))[-keep:]
+        position += n
+    return matches
+
+POOL_ENGINES = {
+    "Naive Stream": naive_view_stream_matching,
+    "KMP Stream": kmp_chunk_stream_matching
+}
+
+# Sequences are packed into blocks of at most this many bytes (a sequence
+# larger than this gets a block of its own)
+DEFAULT_BLOCK_BYTES = 256 * 1024 * 1024
+SCAN_CHUNK_BYTES = 64 * 1024
+
+class SharedSequencePool:
+    """
+    Encoded sequences copied into shared memory, addressed by descriptors.
+
+    The creating process owns the blocks: call close() (or use the pool as a
+    context manager) to release them once all workers are done.
+    """
+    def __init__(self, sequences, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            sequences (dict): key -> str (ASCII-encoded sequence) or bytes.
+            block_bytes (int): Target size of each shared memory block.
+        """
+        self.blocks = []
+        self.descriptors = {}  # key -> (block name, offset, length)
+
+        pending = []
+        pending_size = 0
+        for key, sequence in sequences.items():
+            data = sequence.encode('ascii') if isinstance(sequence, str) else bytes(sequence)
+            if pending and pending_size + len(data) > block_bytes:
+                self._add_block(pending, pending_size)
+                pending, pending_size = [], 0
+            pending.append((key, data))
+            pending_size += len(data)
+        if pending:
+            self._add_block(pending, pending_size)
+
+    def _add_block(self, items, size):
+        block = shared_memory.SharedMemory(create=True, size=max(1, size))
+        self.blocks.append(block)
+        offset = 0
+        for key, data in items:
+            block.buf[offset : offset + len(data)] = data
+            self.descriptors[key] = (block.name, offset, len(data))
+            offset += len(data)
+
+    @property
+    def nbytes(self):
+        return sum(length for _, _, length in self.descriptors.values())
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Blocks this process has attached to, by name (one attach per worker)
+_attached_blocks = {}
+
+def _close_attached_blocks():
+    for block in _attached_blocks.values():
+        block.close()
+    _attached_blocks.clear()
+
+def _init_worker():
+    # Pool workers leave through multiprocessing's exit finalizers (atexit
+    # handlers do not run in them), so close the attached blocks there.
+    # Closing only unmaps them; the creating process still unlinks them.
+    util.Finalize(None, _close_attached_blocks, exitpriority=10)
+
+def sequence_view(descriptor):
+    """
+    memoryview of one sequence in shared memory, without copying it.
+    """
+    name, offset, length = descriptor
+    block = _attached_blocks.get(name)
+    if block is None:
+        block = _attached_blocks[name] = shared_memory.SharedMemory(name=name)
+    return block.buf[offset : offset + length]
+
+def iter_view_chunks(view, chunk_size=SCAN_CHUNK_BYTES):
+    """
+    Yield zero-copy memoryview slices of chunk_size bytes.
+    """
+    for start in range(0, len(view), chunk_size):
+        yield view[start : start + chunk_size]
+
+def scan_job(job):
+    """
+    Worker entry point: match one pattern against one shared sequence.
+
+    Args:
+        job (tuple): (pattern_key, pattern, target_key, descriptor, engine_name).
+            pattern is a str (ASCII) or bytes.
+
+    Returns:
+        tuple: (pattern_key, target_key, engine_name, matches, time_sec)
+    """
+    pattern_key, pattern, target_key, descriptor, engine_name = job
+    if isinstance(pattern, str):
+        pattern = pattern.encode('ascii')
+    view = sequence_view(descriptor)
+    start = time.perf_counter()
+    # Iterating a memoryview yields ints, as does indexing bytes, so the
+    # engines compare the pattern to the shared data symbol for symbol
+    matches = POOL_ENGINES[engine_name](iter_view_chunks(view), pattern)
+    elapsed = time.perf_counter() - start
+    view.release()
+    return pattern_key, target_key, engine_name, matches, elapsed
+
+def run_match_matrix(patterns, pool, engine_names=("KMP Stream",), workers=None, targets=None):
+    """
+    Match every pattern against every pooled sequence on a process pool.
+
+    Args:
+        patterns (dict): pattern_key -> pattern.
+        pool (SharedSequencePool): Sequences to scan.
+        engine_names (iterable): Keys of POOL_ENGINES to run.
+        workers (int): Process count (None: one per CPU).
+        targets (iterable): Pool keys to scan (default: all).
+
+    Returns:
+        list: scan_job() results.
+    """
+    targets = list(pool.descriptors) if targets is None else list(targets)
+    jobs = [(pattern_key, pattern, target_key, pool.descriptors[target_key], engine_name)
+            for pattern_key, pattern in patterns.items() if pattern
+            for target_key in targets
+            for engine_name in engine_names]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(scan_job, jobs, chunksize=max(1, len(jobs) // 64)))
+
+if __name__ == "__main__":
+    import os
+    import pickle
+    from main import load_encoded_sequences
+
+    file_path = "cs448b_ipasn.csv"
+    encoded = load_encoded_sequences(file_path)
+    sequences = {("flow", ip): seq for ip, seq in encoded["ip_flow_sequences"].items()}
+    sequences.update({("asn", ip): seq for ip, seq in encoded["ip_asn_sequences_str"].items()})
+
+    with SharedSequencePool(sequences) as pool:
+        print(f"Pooled {len(pool.descriptors)} sequences ({pool.nbytes} bytes) in {len(pool.blocks)} block(s)")
+        for encoding, patterns in (("flow", encoded["flow_patterns_data"]), ("asn", encoded["asn_patterns_data"])):
+            targets = [key for key in pool.descriptors if key[0] == encoding]
+            start = time.perf_counter()
+            results = run_match_matrix(patterns, pool, tuple(POOL_ENGINES), workers=os.cpu_count(), targets=targets)
+            elapsed = time.perf_counter() - start
+
+            # Serial reference over the same sequences
+            for pattern_key, target_key, engine_name, matches, _ in results:
+                expected = POOL_ENGINES[engine_name]([sequences[target_key]], patterns[pattern_key])
+                if matches != expected:
+                    print(f"  MISMATCH: pattern {pattern_key} vs {target_key} ({engine_name})")
+            print(f"  {encoding}: {len(results)} jobs in {elapsed:.3f}s")
+        descriptor_bytes = len(pickle.dumps(next(iter(pool.descriptors.values()))))
+        print(f"Each job ships a {descriptor_bytes}-byte descriptor instead of its sequence "
+              f"(average {pool.nbytes / len(pool.descriptors):.0f} bytes)")
@@ -0,0 +1,205 @@
+## Signature library: many patterns, deduplicated and compiled once
+# Signatures are loaded from a JSONL or CSV file (id, pattern, encoding plus
+# free-form metadata) instead of Python literals. Identical (encoding,
+# pattern) pairs are merged, and each encoding's unique patterns are compiled
+# into one Aho-Corasick automaton, cached in a PatternRegistry, so a scan
+# costs about the same for ten thousand signatures as for one. Patterns are
+# also grouped by length and alphabet, but only to describe the library: the
+# automaton covers every group at once.
+
+import csv
+import json
+from collections import OrderedDict
+
+from functions import aho_corasick_feed
+from compressed_input import open_input
+from pattern_registry import PatternRegistry
+
+SIGNATURE_FIELDS = ("id", "pattern", "encoding")
+DEFAULT_ENCODING = "flow"
+DEFAULT_SIGNATURE_FILE = "signatures.jsonl"
+SCAN_CHUNK_CHARS = 64 * 1024
+
+def _signature_from_record(record, line_number, path):
+    pattern = record.get("pattern")
+    if not pattern:
+        print(f"    Warning: Skipping signature without a pattern at line {line_number} of '{path}'")
+        return None
+    metadata = record.get("metadata")
+    if not isinstance(metadata, dict):
+        # CSV rows (and flat JSON) keep every extra column as metadata
+        metadata = {key: value for key, value in record.items() if key not in SIGNATURE_FIELDS}
+    return {
+        "id": str(record.get("id") or f"line-{line_number}"),
+        "pattern": str(pattern),
+        "encoding": record.get("encoding") or DEFAULT_ENCODING,
+        "metadata": metadata
+    }
+
+def load_signature_library(path):
+    """
+    Load signatures from a JSONL (one object per line) or CSV file, plain or compressed.
+
+    Returns:
+        list: Signature dicts with id, pattern, encoding and metadata.
+    """
+    signatures = []
+    with open_input(path, newline='') as f:
+        if path.endswith(".csv") or path.endswith(".csv.gz"):
+            records = enumerate(csv.DictReader(f), start=2)
+        else:
+            records = ((line_number, json.loads(line)) for line_number, line in enumerate(f, start=1)
+                       if line.strip())
+        for line_number, record in records:
+            signature = _signature_from_record(record, line_number, path)
+            if signature is not None:
+                signatures.append(signature)
+    return signatures
+
+def write_signature_library(path, signatures):
+    with open(path, 'w', encoding='utf-8') as f:
+        for signature in signatures:
+            f.write(json.dumps(signature, sort_keys=True) + "\n")
+
+def dedupe_signatures(signatures):
+    """
+    Merge signatures with the same (encoding, pattern).
+
+    Returns:
+        OrderedDict: (encoding, pattern) -> list of signature ids.
+    """
+    unique = OrderedDict()
+    for signature in signatures:
+        unique.setdefault((signature["encoding"], signature["pattern"]), []).append(signature["id"])
+    return unique
+
+def group_signatures(unique):
+    """
+    Group unique patterns by (encoding, pattern length, alphabet). Used for
+    SignatureSet.summary() only; compilation is per encoding.
+
+    Returns:
+        dict: (encoding, length, sorted alphabet str) -> list of patterns.
+    """
+    groups = {}
+    for encoding, pattern in unique:
+        key = (encoding, len(pattern), ''.join(sorted(set(pattern))))
+        groups.setdefault(key, []).append(pattern)
+    return groups
+
+class SignatureSet:
+    """
+    A deduplicated signature library compiled to one automaton per encoding
+    (not per group; groups only feed summary()).
+    """
+    def __init__(self, signatures, registry=None):
+        self.registry = registry if registry is not None else PatternRegistry()
+        self.signature_count = len(signatures)
+        unique = dedupe_signatures(signatures)
+        self.groups = group_signatures(unique)
+        self.patterns = {}  # encoding -> tuple of unique patterns (automaton order)
+        self.ids = {}       # encoding -> list of id lists, parallel to patterns
+        for encoding in sorted({encoding for encoding, _ in unique}):
+            # Sorted so the same library always gives the same registry key
+            patterns = tuple(sorted(pattern for pattern_encoding, pattern in unique if pattern_encoding == encoding))
+            self.patterns[encoding] = patterns
+            self.ids[encoding] = [unique[(encoding, pattern)] for pattern in patterns]
+
+    def automaton(self, encoding=DEFAULT_ENCODING):
+        return self.registry.get(self.patterns[encoding], "aho_corasick")
+
+    def scan(self, chunks, encoding=DEFAULT_ENCODING):
+        """
+        Match every signature of one encoding against a chunked stream.
+
+        Returns:
+            dict: signature id -> list of match start positions.
+        """
+        results = {}
+        if encoding not in self.patterns:
+            return results
+        automaton = self.automaton(encoding)
+        ids = self.ids[encoding]
+        state, position = 0, 0
+        for chunk in chunks:
+            found = []
+            state, position = aho_corasick_feed(chunk, automaton, state, position, found)
+            for index, start in found:
+                for signature_id in ids[index]:
+                    results.setdefault(signature_id, []).append(start)
+        return results
+
+    def match(self, text, encoding=DEFAULT_ENCODING):
+        return self.scan((text[i : i + SCAN_CHUNK_CHARS] for i in range(0, len(text), SCAN_CHUNK_CHARS)),
+                         encoding)
+
+    def summary(self):
+        unique_count = sum(len(patterns) for patterns in self.patterns.values())
+        return (f"{self.signature_count} signatures, {unique_count} unique patterns in "
+                f"{len(self.groups)} (encoding, length, alphabet) groups")
+
+def compile_signature_library(path, registry=None, registry_path=None):
+    """
+    Load and compile a signature library. With registry_path, compiled
+    automata are loaded from and saved to that file, so an unchanged library
+    is compiled only once across runs.
+    """
+    registry = registry if registry is not None else PatternRegistry()
+    if registry_path is not None:
+        registry.load(registry_path)
+    signature_set = SignatureSet(load_signature_library(path), registry)
+    for encoding in signature_set.patterns:
+        signature_set.automaton(encoding)
+    if registry_path is not None and registry.misses:
+        registry.save(registry_path)
+    return signature_set
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import time
+
+    import numpy as np
+
+    from functions import kmp_chunk_stream_matching
+    from generate_augmented_flows import augment_sequence
+    from main2 import load_sequence_file
+
+    signature_set = compile_signature_library(DEFAULT_SIGNATURE_FILE)
+    print(f"Loaded '{DEFAULT_SIGNATURE_FILE}': {signature_set.summary()}")
+
+    random.seed(0)
+    text = augment_sequence(''.join(load_sequence_file("flow_sequences.txt").values()), 1 << 20)
+    rng = np.random.default_rng(448)
+    synthetic = []
+    for k in range(10000):
+        # Half are substrings of the text so the library actually matches
+        length = int(rng.integers(6, 17))
+        if k % 2:
+            start = int(rng.integers(len(text) - length))
+            pattern = text[start : start + length]
+        else:
+            pattern = ''.join(rng.choice(list("hxml"), size=length))
+        synthetic.append({"id": f"synthetic-{k}", "pattern": pattern, "encoding": "flow", "metadata": {}})
+
+    with tempfile.TemporaryDirectory() as directory:
+        library_path = os.path.join(directory, "synthetic_signatures.jsonl")
+        write_signature_library(library_path, synthetic)
+        for count in (1, 100, 1000, 10000):
+            write_signature_library(library_path, synthetic[:count])
+            start = time.perf_counter()
+            subset = compile_signature_library(library_path)
+            compile_time = time.perf_counter() - start
+            start = time.perf_counter()
+            results = subset.match(text)
+            scan_time = time.perf_counter() - start
+            print(f"  {count:5d} signatures ({subset.summary()}): compile {compile_time:.3f}s, "
+                  f"scan {scan_time:.3f}s over {len(text)} symbols, "
+                  f"{sum(len(positions) for positions in results.values())} matches")
+
+    # Spot-check the automaton against single-pattern KMP
+    for signature in synthetic[:50]:
+        expected = kmp_chunk_stream_matching([text], signature["pattern"])
+        if results.get(signature["id"], []) != expected:
+            print(f"  MISMATCH for {signature['id']}")
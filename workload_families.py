@@ -0,0 +1,205 @@
+## Named workload families for stress-testing the matching engines
+# Every benchmark text so far is derived from the 10 lines of
+# flow_sequences.txt, which never exercises the engines' worst cases. Each
+# family here builds a (text, pattern) pair of a given text length n, pattern
+# length m and alphabet size k, so any engine can be run on any family.
+
+from bisect import bisect_right
+
+import numpy as np
+
+from generate_augmented_flows import default_rng
+
+DEFAULT_ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+MARKOV_SOURCE_FILE = "flow_sequences.txt"
+
+def family_alphabet(alphabet_size, alphabet=DEFAULT_ALPHABET):
+    if not 1 <= alphabet_size <= len(alphabet):
+        raise ValueError(f"alphabet_size must be between 1 and {len(alphabet)}")
+    return alphabet[:alphabet_size]
+
+def _symbols_from_codes(codes, alphabet):
+    """
+    Map an integer array of symbol indexes to a str over alphabet.
+    """
+    lookup = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+    return lookup[codes].tobytes().decode('ascii')
+
+def _pattern_from_text(text, m, rng):
+    """
+    A length-m substring of text at a random offset (so it occurs at least once).
+    """
+    if m > len(text):
+        raise ValueError("Pattern length must not exceed the text length")
+    start = int(rng.integers(len(text) - m + 1))
+    return text[start : start + m]
+
+def uniform_random(n, m, alphabet_size=4, rng=None, alphabet=DEFAULT_ALPHABET):
+    """
+    Independent uniform symbols; the pattern is a random substring of the text.
+    """
+    rng = default_rng(rng)
+    symbols = family_alphabet(alphabet_size, alphabet)
+    text = _symbols_from_codes(rng.integers(len(symbols), size=n), symbols)
+    return text, _pattern_from_text(text, m, rng)
+
+def fit_markov_chain(sequences, smoothing=1.0):
+    """
+    First-order transition matrix fit from the given sequences.
+
+    Returns:
+        tuple: (alphabet str, initial distribution, transition matrix rows)
+    """
+    alphabet = ''.join(sorted(set(''.join(sequences))))
+    index = {symbol: i for i, symbol in enumerate(alphabet)}
+    counts = np.full((len(alphabet), len(alphabet)), smoothing)
+    initial = np.full(len(alphabet), smoothing)
+    for seq in sequences:
+        if not seq:
+            continue
+        initial[index[seq[0]]] += 1
+        for prev, curr in zip(seq, seq[1:]):
+            counts[index[prev], index[curr]] += 1
+    return alphabet, initial / initial.sum(), counts / counts.sum(axis=1, keepdims=True)
+
+def load_markov_sources(source_path=MARKOV_SOURCE_FILE):
+    sequences = []
+    with open(source_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if ':' in line:
+                sequences.append(line.split(':', 1)[1].strip())
+    return sequences
+
+def markov(n, m, alphabet_size=None, rng=None, source_path=MARKOV_SOURCE_FILE, chain=None):
+    """
+    Text from a first-order Markov chain fit to the real flow sequences. The
+    alphabet is the source's (h/x/m/l), so alphabet_size is ignored.
+    """
+    rng = default_rng(rng)
+    alphabet, initial, transitions = chain or fit_markov_chain(load_markov_sources(source_path))
+    last = len(alphabet) - 1
+    rows = np.cumsum(transitions, axis=1).tolist()
+    draws = rng.random(n).tolist()
+    codes = np.empty(n, dtype=np.intp)
+    state = min(last, bisect_right(np.cumsum(initial).tolist(), draws[0])) if n else 0
+    for i in range(n):
+        if i:
+            state = min(last, bisect_right(rows[state], draws[i]))
+        codes[i] = state
+    text = _symbols_from_codes(codes, alphabet)
+    return text, _pattern_from_text(text, m, rng)
+
+def periodic_runs(n, m, alphabet_size=4, rng=None, alphabet=DEFAULT_ALPHABET, period_runs=8, mean_run=16):
+    """
+    A random block of period_runs symbol runs (geometric lengths around
+    mean_run), repeated to length n: long runs and a short period.
+    """
+    rng = default_rng(rng)
+    symbols = family_alphabet(alphabet_size, alphabet)
+    run_symbols = rng.integers(len(symbols), size=period_runs)
+    if len(symbols) > 1:
+        # Adjacent runs use different symbols, so runs do not merge
+        for i in range(1, period_runs):
+            while run_symbols[i] == run_symbols[i - 1]:
+                run_symbols[i] = rng.integers(len(symbols))
+    run_lengths = rng.geometric(1.0 / mean_run, size=period_runs)
+    period = _symbols_from_codes(np.repeat(run_symbols, run_lengths), symbols)
+    text = (period * (n // len(period) + 1))[:n]
+    return text, _pattern_from_text(text, m, rng)
+
+def adversarial_naive(n, m, alphabet_size=2, rng=None, alphabet=DEFAULT_ALPHABET):
+    """
+    Text a^n and pattern a^(m-1)b: the naive matcher compares m symbols at
+    every offset and never matches.
+    """
+    symbols = family_alphabet(max(2, alphabet_size), alphabet)
+    return symbols[0] * n, symbols[0] * (m - 1) + symbols[1]
+
+def fibonacci_word(length, a='a', b='b'):
+    """
+    Prefix of the infinite Fibonacci word (f_k = f_{k-1} f_{k-2}) of the given length.
+    """
+    previous, current = b, a
+    while len(current) < length:
+        previous, current = current, current + previous
+    return current[:length]
+
+def adversarial_kmp(n, m, alphabet_size=2, rng=None, alphabet=DEFAULT_ALPHABET):
+    """
+    Fibonacci-word text and pattern. Fibonacci words maximize the chain of
+    failure-link fallbacks KMP follows on a single mismatch (logarithmic in m).
+    The pattern ends in a flipped symbol so every near-occurrence fails late.
+    """
+    symbols = family_alphabet(max(2, alphabet_size), alphabet)
+    text = fibonacci_word(n, symbols[0], symbols[1])
+    pattern = fibonacci_word(m, symbols[0], symbols[1])
+    last = symbols[1] if pattern[-1] == symbols[0] else symbols[0]
+    return text, pattern[:-1] + last
+
+def high_match_density(n, m, alphabet_size=4, rng=None, alphabet=DEFAULT_ALPHABET, period=2):
+    """
+    Text and pattern built from one random block of the given period, so the
+    pattern occurs every period symbols (every symbol with period=1).
+    """
+    rng = default_rng(rng)
+    symbols = family_alphabet(alphabet_size, alphabet)
+    block = _symbols_from_codes(rng.integers(len(symbols), size=period), symbols)
+    text = (block * (n // period + 1))[:n]
+    return text, text[:m]
+
+WORKLOAD_FAMILIES = {
+    "uniform_random": uniform_random,
+    "markov": markov,
+    "periodic_runs": periodic_runs,
+    "adversarial_naive": adversarial_naive,
+    "adversarial_kmp": adversarial_kmp,
+    "high_match_density": high_match_density
+}
+
+def generate_workload(family, n, m, alphabet_size=4, rng=None, **params):
+    """
+    Build a (text, pattern) pair from a named family in WORKLOAD_FAMILIES.
+    """
+    if family not in WORKLOAD_FAMILIES:
+        raise ValueError(f"Unknown workload family '{family}'. Known: {', '.join(WORKLOAD_FAMILIES)}")
+    if m <= 0 or m > n:
+        raise ValueError("Pattern length must be between 1 and the text length")
+    return WORKLOAD_FAMILIES[family](n, m, alphabet_size, rng, **params)
+
+if __name__ == "__main__":
+    import contextlib
+    import csv
+    import io
+    import time
+
+    from functions import stream_data, naive_stream_matching_with_counts, kmp_stream_matching_with_counts
+
+    engines = {
+        "Naive Stream": naive_stream_matching_with_counts,
+        "KMP Stream": kmp_stream_matching_with_counts
+    }
+    n, m, alphabet_size = 100000, 32, 4
+    rng = np.random.default_rng(448)
+
+    header = ["family", "engine", "text_length", "pattern_length", "alphabet_size",
+              "match_count", "comparisons", "comparisons_per_symbol", "time_sec"]
+    rows = []
+    for family in WORKLOAD_FAMILIES:
+        text, pattern = generate_workload(family, n, m, alphabet_size, rng)
+        for engine_name, engine in engines.items():
+            start = time.perf_counter()
+            # The engines print per match; keep the output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                matches, comparisons = engine(stream_data(text), pattern)
+            elapsed = time.perf_counter() - start
+            rows.append([family, engine_name, n, m, alphabet_size,
+                         len(matches), comparisons, comparisons / n, elapsed])
+            print(f"  {family:18s} {engine_name:12s}: {len(matches):6d} matches, "
+                  f"{comparisons / n:6.2f} comparisons/symbol, {elapsed:.3f}s")
+
+    output_csv_filename = "workload_family_results.csv"
+    with open(output_csv_filename, "w", newline="", encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    print(f"\n✅ Workload family run complete. Results saved to {output_csv_filename}")